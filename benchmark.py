@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from display import Display
+from enemy import Enemy
+from enemy_pool import EnemyPool
+from frame import capture_frame
+from flow_field import FlowField, maze_map
+from game_state import GameState
+from path import PATH
+from simulation import new_game_state, run_game_state
+from spatial import SpatialGrid
+from tower import Tower, TargetingPriority, Normal, Heavy, MachineGun, Sniper
+from wave import Wave, DEFAULT_WAVES, Regular, Tough, Fast, Boss
+
+STRESS_SCENARIOS = {
+    "default": dict(board_size=12, spacing=None, towers=6, waves=DEFAULT_WAVES, ticks=2000),
+    "dense": dict(board_size=48, spacing=4, towers=400,
+                  waves=[Wave(1, Regular, 3000, 0, 0), Wave(0, Tough, 2000, 0, 0)], ticks=600),
+    "long_path": dict(board_size=64, spacing=2, towers=150, waves=[Wave(0, Fast, 4000, 0, 0)], ticks=300),
+    "horde": dict(board_size=32, spacing=4, towers=60, waves=[Wave(0, Boss, 5000, 0, 0)], ticks=300),
+    "maze": dict(board_size=100, spacing=None, towers=150, waves=[Wave(0, Tough, 4000, 0, 0)], ticks=300,
+                 maze=True),
+}
+HIGHER_IS_BETTER = {"ticks_per_second": True, "frames_per_second": True, "peak_memory_bytes": False}
+
+
+def brute_force_target(tower: Tower, game_state: GameState):
+    if tower.targeting_priority == TargetingPriority.Strongest:
+        enemies = sorted(game_state.enemies, key=lambda x: x.health, reverse=True)
+    else:
+        enemies = sorted(game_state.enemies, key=lambda x: x.distance, reverse=True)
+    for enemy in enemies:
+        squared_distance = sum([(enemy.position[i] - tower.position[i]) ** 2 for i in range(2)])
+        if squared_distance < tower.max_range ** 2:
+            return enemy
+    return None
+
+
+def serpentine_path(board_size, spacing=4):
+    path = list()
+    rows = list(range(0, board_size, spacing))
+    for row, y in enumerate(rows):
+        xs = range(board_size) if row % 2 == 0 else range(board_size - 1, -1, -1)
+        path.extend([x, y] for x in xs)
+        if row + 1 < len(rows):
+            path.extend([xs[-1], y + step] for step in range(1, spacing))
+    return path
+
+
+def targeting_scenario(tower_count, enemy_count, board_size=64, seed=0):
+    rng = np.random.default_rng(seed)
+    game_state = GameState(board_size, board_size, serpentine_path(board_size), DEFAULT_WAVES, 20, 0)
+    distances = rng.uniform(0, game_state.path_model.total_length, enemy_count)
+    offsets = rng.uniform(-0.2, 0.2, (enemy_count, 2))
+    positions = game_state.path_model.positions_at(distances) + offsets
+    for distance, offset, position in zip(distances, offsets, positions):
+        enemy = game_state.enemy_pool.spawn(position, offset, Regular)
+        enemy.damage_check(rng.integers(0, Regular.health))
+        game_state.enemy_pool.distance[enemy.index] = distance
+    tiles = rng.choice(board_size * board_size, tower_count, replace=False)
+    for i, tile in enumerate(tiles):
+        tower_type = Sniper if i % 4 == 0 else Normal
+        game_state.towers.append(Tower((tile // board_size, tile % board_size), tower_type))
+    return game_state
+
+
+def time_targeting(game_state: GameState, enemy_index, repeats):
+    game_state.enemy_index = enemy_index
+    start = time.perf_counter()
+    for _ in range(repeats):
+        enemy_index.rebuild(game_state.enemy_pool)
+        for tower in game_state.towers:
+            tower.get_target(game_state)
+    return (time.perf_counter() - start) / repeats, [tower.target for tower in game_state.towers]
+
+
+def bench_targeting(tower_count, enemy_count, repeats=5):
+    game_state = targeting_scenario(tower_count, enemy_count)
+    coverage_time, coverage_targets = time_targeting(game_state, game_state.enemy_index, repeats)
+    grid_time, grid_targets = time_targeting(game_state, SpatialGrid(), repeats)
+
+    start = time.perf_counter()
+    brute_force_targets = [brute_force_target(tower, game_state) for tower in game_state.towers]
+    brute_force_time = time.perf_counter() - start
+
+    mismatches = sum(a is not b for a, b in zip(coverage_targets + grid_targets, brute_force_targets * 2))
+    return coverage_time, grid_time, brute_force_time, mismatches
+
+
+def run_targeting_benchmark():
+    print(f"{'towers':>8}{'enemies':>9}{'path ms':>10}{'grid ms':>10}{'scan ms':>10}{'mismatch':>10}")
+    for tower_count in (10, 100, 400):
+        for enemy_count in (100, 1000, 5000):
+            coverage_time, grid_time, brute_force_time, mismatches = bench_targeting(tower_count, enemy_count)
+            print(f"{tower_count:>8}{enemy_count:>9}{coverage_time * 1000:>10.2f}{grid_time * 1000:>10.2f}"
+                  f"{brute_force_time * 1000:>10.2f}{mismatches:>10}")
+
+
+def stress_game_state(board_size, spacing, towers, waves, batched_towers, seed=0, maze=False):
+    if maze:
+        path = maze_map(board_size, board_size)
+    else:
+        path = PATH if spacing is None else serpentine_path(board_size, spacing)
+    game_state = new_game_state([], waves, board_size, board_size, path, health=10 ** 9, gold=10 ** 9,
+                                batched_towers=batched_towers, seed=seed)
+    rng = np.random.default_rng(seed)
+    free_tiles = [tuple(tile) for tile in game_state.map.free_tiles()]
+    tower_types = (Normal, Heavy, MachineGun, Sniper)
+    for number, tile in enumerate(rng.permutation(len(free_tiles))[:towers]):
+        # Mazing placements that would cut the route are turned down, so a maze may end up with fewer towers.
+        game_state.place_tower(free_tiles[tile], tower_types[number % len(tower_types)])
+    return game_state
+
+
+def scenario_game_state(scenario, batched_towers):
+    return stress_game_state(scenario["board_size"], scenario["spacing"], scenario["towers"], scenario["waves"],
+                             batched_towers, maze=scenario.get("maze", False))
+
+
+def bench_ticks(scenario, batched_towers):
+    game_state = scenario_game_state(scenario, batched_towers)
+    result = run_game_state(game_state, scenario["ticks"])
+    return result.ticks_per_second, len(game_state.enemies)
+
+
+def bench_memory(scenario, batched_towers):
+    tracemalloc.start()
+    game_state = scenario_game_state(scenario, batched_towers)
+    run_game_state(game_state, scenario["ticks"])
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench_frames(scenario, frames=60):
+    game_state = scenario_game_state(scenario, True)
+    run_game_state(game_state, scenario["ticks"] - frames)
+    tile_pixels = max(4, 600 // scenario["board_size"])
+    display = Display(scenario["board_size"], scenario["board_size"], tile_pixels, 400, 80, 160)
+    elapsed = 0.0
+    frame = None
+    for _ in range(frames):
+        game_state.tick()
+        start = time.perf_counter()
+        frame = capture_frame(game_state, frame)
+        display.draw(frame)
+        elapsed += time.perf_counter() - start
+    return frames / elapsed
+
+
+def run_stress_benchmark(names, batched_towers):
+    pygame.init()
+    results = dict()
+    print(f"{'scenario':>12}{'enemies':>9}{'ticks/s':>10}{'frames/s':>10}{'peak MB':>10}")
+    for name in names:
+        scenario = STRESS_SCENARIOS[name]
+        ticks_per_second, enemies = bench_ticks(scenario, batched_towers)
+        frames_per_second = bench_frames(scenario)
+        peak_memory = bench_memory(scenario, batched_towers)
+        results[name] = {"ticks_per_second": ticks_per_second, "frames_per_second": frames_per_second,
+                         "peak_memory_bytes": peak_memory, "enemies": enemies}
+        print(f"{name:>12}{enemies:>9}{ticks_per_second:>10.1f}{frames_per_second:>10.1f}"
+              f"{peak_memory / 2 ** 20:>10.1f}")
+    return {"python": platform.python_version(), "numpy": np.__version__, "batched_towers": batched_towers,
+            "scenarios": results}
+
+
+def run_maze_benchmark(board_size=100, towers=3000, rebuild_every=25, seed=0):
+    # Places towers one by one on an open mazing board, timing the incremental field update against rebuilding the
+    # whole field, which is done on every rebuild_every-th placement to check the two agree.
+    flow_map = maze_map(board_size, board_size)
+    game_state = stress_game_state(board_size, None, 0, DEFAULT_WAVES, True, seed, maze=True)
+    reference = FlowField(game_state.map, flow_map)
+    rng = np.random.default_rng(seed)
+    free_tiles = game_state.map.free_tiles()
+    flow_field = game_state.flow_field
+    placed = rejected = rebuilds = 0
+    incremental_time = rebuild_time = 0.0
+    for tile in rng.permutation(len(free_tiles))[:towers]:
+        position = tuple(free_tiles[tile])
+        start = time.perf_counter()
+        accepted = flow_field.block(position, flow_field.spawns)
+        incremental_time += time.perf_counter() - start
+        if not accepted:
+            rejected += 1
+            continue
+        placed += 1
+        game_state.map.set(position, Normal.base_colour_id)
+        if placed % rebuild_every == 0:
+            start = time.perf_counter()
+            reference.rebuild(game_state.map)
+            rebuild_time += time.perf_counter() - start
+            rebuilds += 1
+            if not (reference.distance == flow_field.distance).all():
+                raise AssertionError(f"Flow field differs from a rebuild after blocking {position}")
+    print(f"{board_size}x{board_size} board, {placed} towers placed, {rejected} rejected for blocking the route")
+    print(f"incremental {incremental_time / towers * 1000:.3f} ms per placement, "
+          f"rebuild {rebuild_time / max(rebuilds, 1) * 1000:.2f} ms")
+
+
+def bench_entity_memory(count=10000):
+    enemy_pool = EnemyPool()
+    sizes = dict()
+    for name, make in (("Enemy", lambda i: Enemy(enemy_pool, i, i, Regular)),
+                       ("Tower", lambda i: Tower((i % 100, i // 100), Normal))):
+        tracemalloc.start()
+        entities = [make(i) for i in range(count)]
+        sizes[name] = tracemalloc.get_traced_memory()[0] / len(entities)
+        tracemalloc.stop()
+        print(f"{name}: {sizes[name]:.0f} bytes each")
+    return sizes
+
+
+def compare_results(results, baseline, tolerance):
+    regressions = list()
+    for name, metrics in results["scenarios"].items():
+        if name not in baseline["scenarios"]:
+            continue
+        for metric, higher_is_better in HIGHER_IS_BETTER.items():
+            previous = baseline["scenarios"][name][metric]
+            change = (metrics[metric] - previous) / previous
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{name} {metric}: {previous:.1f} -> {metrics[metric]:.1f} ({change:+.1%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark targeting or whole-game stress scenarios.")
+    parser.add_argument("suite", nargs="?", choices=("targeting", "stress", "entities", "maze"), default="targeting")
+    parser.add_argument("--scenarios", nargs="+", choices=tuple(STRESS_SCENARIOS), default=tuple(STRESS_SCENARIOS))
+    parser.add_argument("--per-object", action="store_true", help="tick towers one by one instead of batched")
+    parser.add_argument("--output", default=None, help="JSON file to write the stress results to")
+    parser.add_argument("--compare", default=None, help="earlier JSON results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    arguments = parser.parse_args()
+
+    if arguments.suite == "targeting":
+        run_targeting_benchmark()
+    elif arguments.suite == "entities":
+        bench_entity_memory()
+    elif arguments.suite == "maze":
+        run_maze_benchmark()
+    else:
+        stress_results = run_stress_benchmark(arguments.scenarios, not arguments.per_object)
+        if arguments.output is not None:
+            with open(arguments.output, "w") as output_file:
+                json.dump(stress_results, output_file, indent=2)
+        if arguments.compare is not None:
+            with open(arguments.compare) as baseline_file:
+                found = compare_results(stress_results, json.load(baseline_file), arguments.tolerance)
+            for regression in found:
+                print(f"regression: {regression}")
+            if found:
+                raise SystemExit(1)
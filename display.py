@@ -1,6 +1,13 @@
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
 import pygame
 
-from game_state import GameState
+from frame import Frame
+from game_state import TICKS_PER_SECOND
+from profiler import Profiler, PERCENTILES
 from tower import TowerType, Normal, MachineGun, Sniper, Heavy
 from wave import Wave
 
@@ -23,6 +30,93 @@ COLOR_VALUES_DICT = {-1: WHITE,
                      2: TOWER_BASE_RED,
                      3: TOWER_BASE_GREEN,
                      4: TOWER_BASE_BLUE}
+TILE_COLOUR_TABLE = np.array([COLOR_VALUES_DICT[value] for value in range(-1, 5)], dtype=np.uint8)
+
+HEALTH_TINTS = 16
+SPRITE_COLOUR_KEY = (255, 0, 255)
+
+FONT_NAME = "consolas"
+FONT_CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "tower-defence",
+                               "fonts.json")
+
+INSTRUCTION_LINES = ["Move around using arrow keys",
+                     "Press 'P' to pause/unpause",
+                     "Q/W/E/R for 1x/2x/4x/max speed",
+                     "Use 1-4 keys to select a tower type",
+                     "Press the number again to build a tower",
+                     "Kill enemies to get more gold",
+                     "Don't let them reach the exit",
+                     "You lose if you run out of health!",
+                     "Finish all the waves to win"]
+
+
+def find_font(name, cache_path=FONT_CACHE_PATH):
+    # match_font scans every installed font on first use, which can take seconds, so the answer is kept on disk.
+    # A cached None means the font is missing and pygame's default font is used; delete the file to search again.
+    try:
+        with open(cache_path) as cache_file:
+            cached = json.load(cache_file)
+    except (OSError, ValueError):
+        cached = dict()
+    if name in cached and (cached[name] is None or os.path.exists(cached[name])):
+        return cached[name]
+
+    cached[name] = pygame.font.match_font(name)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as cache_file:
+            json.dump(cached, cache_file)
+    except OSError:
+        pass
+    return cached[name]
+
+
+class TextCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+
+    def render(self, font, text, colour):
+        key = (font, text, colour)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, colour)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.capacity:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+
+class SpriteCache:
+    def __init__(self, tile_pixels):
+        self.tower_radius = tile_pixels / 4
+        self.enemy_sprites = dict()
+        self.tower_sprites = dict()
+
+    def enemy(self, enemy_type):
+        # One surface per health tint, from black at tint 0 to the full colour at HEALTH_TINTS - 1.
+        sprites = self.enemy_sprites.get(enemy_type)
+        if sprites is None:
+            sprites = list()
+            for tint in range(HEALTH_TINTS):
+                sprite = pygame.Surface((enemy_type.pixels, enemy_type.pixels)).convert()
+                sprite.fill(tuple(int(channel * tint / (HEALTH_TINTS - 1)) for channel in enemy_type.colour))
+                sprites.append(sprite)
+            self.enemy_sprites[enemy_type] = sprites
+        return sprites
+
+    def tower(self, colour):
+        sprite = self.tower_sprites.get(colour)
+        if sprite is None:
+            size = int(2 * self.tower_radius) + 2
+            sprite = pygame.Surface((size, size)).convert()
+            sprite.fill(SPRITE_COLOUR_KEY)
+            sprite.set_colorkey(SPRITE_COLOUR_KEY, pygame.RLEACCEL)
+            pygame.draw.circle(sprite, colour, (size / 2, size / 2), self.tower_radius)
+            self.tower_sprites[colour] = sprite
+        return sprite
 
 
 class Display:
@@ -41,104 +135,171 @@ class Display:
         pygame.display.set_caption('Tower Defence')
 
         pygame.font.init()
-        self.menu_font = pygame.font.SysFont("consolas", 36)
-        self.regular_font = pygame.font.SysFont("consolas", 24)
-        self.small_font = pygame.font.SysFont("consolas", 12)
-        self.tiny_font = pygame.font.SysFont("consolas", 10)
-
-    def draw(self, game_state: GameState):
-        self.draw_tiles(game_state)
-        self.draw_cursor(game_state)
-        self.draw_enemies(game_state)
-        self.draw_towers(game_state)
-        self.draw_tower_range(game_state)
-        self.draw_projectiles(game_state)
-        self.draw_menu(game_state)
-        self.draw_wave_counter(game_state)
-        if game_state.paused:
-            self.draw_pause()
-        pygame.display.flip()
+        font_path = find_font(FONT_NAME)
+        self.menu_font = pygame.font.Font(font_path, 36)
+        self.regular_font = pygame.font.Font(font_path, 24)
+        self.small_font = pygame.font.Font(font_path, 12)
+        self.tiny_font = pygame.font.Font(font_path, 10)
+
+        self.text_cache = TextCache(256)
+        self.sprites = SpriteCache(tile_pixels)
+        self.tower_layer = None
+        self.tower_blits = list()
+        self.board_rect = pygame.Rect(self.menu_pixels, 0, board_width * tile_pixels, self.pixels_height)
+        self.background = pygame.Surface(self.pixels)
+        self.background_version = None
+        self.was_paused = None
+        self.menu_state = None
+        self.wave_counter_state = None
+        self.previous_rects = list()
+
+    def render_text(self, font, text, colour):
+        return self.text_cache.render(font, text, colour)
+
+    def draw(self, frame: Frame, profiler: Profiler = None):
+        tile_rects = self.update_background(frame)
+        full_redraw = tile_rects is None or self.was_paused != frame.paused
+        self.was_paused = frame.paused
+
+        if full_redraw:
+            self.screen.blit(self.background, (0, 0))
+            self.menu_state = self.wave_counter_state = None
+            tile_rects = list()
+        else:
+            self.screen.blits([(self.background, rect, rect) for rect in self.previous_rects + tile_rects],
+                              doreturn=False)
+
+        self.screen.set_clip(self.board_rect)
+        board_rects = [self.draw_cursor(frame)]
+        board_rects.extend(self.draw_enemies(frame))
+        self.draw_towers(frame)
+        board_rects.append(self.draw_tower_range(frame))
+        board_rects.extend(self.draw_projectiles(frame))
+        if frame.paused:
+            board_rects.extend(self.draw_pause())
+        if profiler is not None:
+            board_rects.append(self.draw_profile(profiler, frame))
+        self.screen.set_clip(None)
+        board_rects = [rect.clip(self.board_rect) for rect in board_rects if rect is not None]
+
+        dirty_rects = self.previous_rects + tile_rects + board_rects
+        dirty_rects.extend(self.draw_menu(frame))
+        dirty_rects.extend(self.draw_wave_counter(frame))
+        self.previous_rects = board_rects
+
+        if full_redraw:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty_rects)
 
-    def draw_tile(self, position, colour):
-        pygame.draw.rect(
-            self.screen,
+    def draw_tile(self, position, colour, surface=None):
+        return pygame.draw.rect(
+            self.screen if surface is None else surface,
             colour,
             (*position, self.tile_pixels,
              self.tile_pixels))
 
-    def draw_tiles(self, game_state: GameState):
-        for i in range(self.board_width):
-            for j in range(self.board_height):
-                tile_colour = COLOR_VALUES_DICT[game_state.map[i][j]]
-                self.draw_tile((self.menu_pixels + i * self.tile_pixels, j * self.tile_pixels), tile_colour)
-
-    def draw_cursor(self, game_state: GameState):
+    def update_background(self, frame: Frame):
+        tile_grid = frame.map
+        changes = None if self.background_version is None else tile_grid.changes_since(self.background_version)
+        self.background_version = tile_grid.version
+        if changes is None or None in changes:
+            self.draw_tiles(frame)
+            return None
+        return [self.draw_tile((self.menu_pixels + x * self.tile_pixels, y * self.tile_pixels),
+                               COLOR_VALUES_DICT[int(tile_grid[x, y])], self.background) for x, y in set(changes)]
+
+    def draw_tiles(self, frame: Frame):
+        self.background.fill(BLACK)
+        tiles = pygame.surfarray.make_surface(TILE_COLOUR_TABLE[frame.map.tiles + 1])
+        self.background.blit(pygame.transform.scale(tiles, self.board_rect.size), self.board_rect)
+
+    def draw_cursor(self, frame: Frame):
         cursor_box = pygame.Rect(
-            self.menu_pixels + game_state.cursor[0] * self.tile_pixels,
-            game_state.cursor[1] * self.tile_pixels,
+            self.menu_pixels + frame.cursor[0] * self.tile_pixels,
+            frame.cursor[1] * self.tile_pixels,
             self.tile_pixels,
             self.tile_pixels)
-        pygame.draw.rect(self.screen, YELLOW, cursor_box, width=2)
+        return pygame.draw.rect(self.screen, YELLOW, cursor_box, width=2)
 
     def draw_enemy(self, position, pixels, colour):
         enemy_box = pygame.Rect(*position, pixels, pixels)
-        pygame.draw.rect(self.screen, colour, enemy_box)
-
-    def draw_enemies(self, game_state: GameState):
-        for enemy in game_state.enemies:
-            self.draw_enemy(
-                (self.menu_pixels + enemy.position[0] * self.tile_pixels + (self.tile_pixels - enemy.pixels) / 2,
-                 enemy.position[1] * self.tile_pixels + (self.tile_pixels - enemy.pixels) / 2), enemy.pixels,
-                tuple(enemy.colour[i] * enemy.health/enemy.max_health for i in range(3)))
+        return pygame.draw.rect(self.screen, colour, enemy_box)
+
+    def draw_enemies(self, frame: Frame):
+        if frame.enemy_count == 0:
+            return []
+        pixels = np.array([enemy_type.pixels for enemy_type in frame.enemy_types])[frame.enemy_type_ids]
+        corners = frame.enemy_positions * self.tile_pixels + ((self.tile_pixels - pixels) / 2)[:, None]
+        corners[:, 0] += self.menu_pixels
+        sprites = [sprite for enemy_type in frame.enemy_types for sprite in self.sprites.enemy(enemy_type)]
+        # Any health left rounds up to at least the first tint, so a live enemy never turns fully black.
+        tints = np.ceil(frame.enemy_health * (HEALTH_TINTS - 1)).astype(np.int64)
+        keys = frame.enemy_type_ids * HEALTH_TINTS + tints
+        return self.screen.blits([(sprites[key], corner) for key, corner in zip(keys.tolist(),
+                                                                                  corners.astype(np.int64).tolist())])
 
     def draw_tower(self, position, color):
-        pygame.draw.circle(self.screen,
-                           color,
-                           position,
-                           radius=1 / 4 * self.tile_pixels)
-
-    def draw_towers(self, game_state):
-        for tower in game_state.towers:
-            self.draw_tower((self.menu_pixels + self.tile_pixels * (tower.position[0] + 1 / 2),
-                             self.tile_pixels * (tower.position[1] + 1 / 2)),
-                            tower.colour)
-
-    def draw_tower_range(self, game_state: GameState):
-        if game_state.selected_tower_type is None:
-            return
-        pygame.draw.circle(self.screen,
-                           YELLOW,
-                           (self.menu_pixels + self.tile_pixels * (game_state.cursor[0] + 1/2),
-                            self.tile_pixels * (game_state.cursor[1] + 1/2)),
-                           radius=game_state.selected_tower_type.max_range * self.tile_pixels,
-                           width=2)
-
-    def draw_projectiles(self, game_state: GameState):
-        for projectile in game_state.projectiles:
-            line_start = (self.menu_pixels + self.tile_pixels * (projectile[0][0] + 1/2),
-                          self.tile_pixels * (projectile[0][1] + 1/2))
-            line_end = (self.menu_pixels + self.tile_pixels * (projectile[1][0] + 1/2),
-                        self.tile_pixels * (projectile[1][1] + 1/2))
-            pygame.draw.line(self.screen, YELLOW, line_start, line_end)
-
-    def draw_menu(self, game_state: GameState):
+        return pygame.draw.circle(self.screen,
+                                  color,
+                                  position,
+                                  radius=1 / 4 * self.tile_pixels)
+
+    def draw_towers(self, frame: Frame):
+        # Frames share the towers tuple until one is bought, so the blit list is only rebuilt then.
+        if frame.towers is not self.tower_layer:
+            self.tower_layer = frame.towers
+            self.tower_blits = list()
+            for position, colour in frame.towers:
+                sprite = self.sprites.tower(colour)
+                self.tower_blits.append((sprite, (self.menu_pixels + self.tile_pixels * (position[0] + 1 / 2)
+                                                  - sprite.get_width() / 2,
+                                                  self.tile_pixels * (position[1] + 1 / 2) - sprite.get_height() / 2)))
+        self.screen.blits(self.tower_blits, doreturn=False)
+
+    def draw_tower_range(self, frame: Frame):
+        if frame.selected_tower_type is None:
+            return None
+        range_rect = pygame.draw.circle(self.screen,
+                                        YELLOW,
+                                        (self.menu_pixels + self.tile_pixels * (frame.cursor[0] + 1/2),
+                                         self.tile_pixels * (frame.cursor[1] + 1/2)),
+                                        radius=frame.selected_tower_type.max_range * self.tile_pixels,
+                                        width=2)
+        coverage_text = self.render_text(self.small_font, f"{frame.covered_tiles} path tiles", YELLOW)
+        coverage_rect = self.screen.blit(coverage_text, (self.menu_pixels + self.tile_pixels * frame.cursor[0],
+                                                         self.tile_pixels * (frame.cursor[1] + 1)))
+        return range_rect.union(coverage_rect)
+
+    def draw_projectiles(self, frame: Frame):
+        segments = (frame.projectiles + 1/2) * self.tile_pixels
+        segments[:, 0::2] += self.menu_pixels
+        return [pygame.draw.line(self.screen, YELLOW, (x0, y0), (x1, y1)) for x0, y0, x1, y1 in segments.tolist()]
+
+    def draw_menu(self, frame: Frame):
+        menu_state = (frame.health, frame.gold, frame.selected_tower_type)
+        if menu_state == self.menu_state:
+            return []
+        self.menu_state = menu_state
+
         menu_panel = pygame.Rect(0, 0, self.menu_pixels, self.pixels_height)
         pygame.draw.rect(self.screen, GRAY, menu_panel)
 
-        health_text = self.regular_font.render(f'Health {game_state.health}', True, WHITE)
-        gold_text = self.regular_font.render(f'Gold {game_state.gold}', True, WHITE)
+        health_text = self.render_text(self.regular_font, f'Health {frame.health}', WHITE)
+        gold_text = self.render_text(self.regular_font, f'Gold {frame.gold}', WHITE)
 
         self.screen.blit(health_text, (20, 20))
         self.screen.blit(gold_text, (200, 20))
 
         for i, tower_type in enumerate([Normal, Heavy, MachineGun, Sniper]):
-            self.draw_tower_info((10, 60 + i * self.tower_panel_pixels), i+1, tower_type, game_state)
+            self.draw_tower_info((10, 60 + i * self.tower_panel_pixels), i+1, tower_type, frame)
         self.draw_instructions((10, 70 + 4 * self.tower_panel_pixels))
+        return [menu_panel]
 
-    def draw_tower_info(self, position, key: int, tower_type: TowerType, game_state: GameState):
+    def draw_tower_info(self, position, key: int, tower_type: TowerType, frame: Frame):
         tower_panel = pygame.Rect(*position, self.menu_pixels - 20, self.tower_panel_pixels - 10)
 
-        if tower_type.price > game_state.gold:
+        if tower_type.price > frame.gold:
             panel_colour = DARK_GRAY
             tower_price_text_colour = LIGHT_GRAY
         else:
@@ -146,7 +307,7 @@ class Display:
             tower_price_text_colour = YELLOW
 
         pygame.draw.rect(self.screen, panel_colour, tower_panel)
-        if tower_type == game_state.selected_tower_type:
+        if tower_type == frame.selected_tower_type:
             pygame.draw.rect(self.screen, tower_price_text_colour, tower_panel, width=2)
 
         tower_base_position = (position[0] + 10, position[1] + 10)
@@ -155,19 +316,19 @@ class Display:
         tower_position = (tower_base_position[0] + self.tile_pixels/2, tower_base_position[1] + self.tile_pixels/2)
         self.draw_tower(tower_position, tower_type.colour)
 
-        name_text = self.regular_font.render(tower_type.name, True, WHITE)
+        name_text = self.render_text(self.regular_font, tower_type.name, WHITE)
         self.screen.blit(name_text, (position[0] + self.tile_pixels + 20, position[1] + 10))
 
-        price_text = self.regular_font.render(str(tower_type.price), True, tower_price_text_colour)
+        price_text = self.render_text(self.regular_font, str(tower_type.price), tower_price_text_colour)
         self.screen.blit(price_text, (position[0] + self.menu_pixels - 80, position[1] + 10))
 
-        damage_text = self.small_font.render(f"{tower_type.damage} DMG", True, WHITE)
+        damage_text = self.render_text(self.small_font, f"{tower_type.damage} DMG", WHITE)
         self.screen.blit(damage_text, (position[0] + self.tile_pixels + 20, position[1] + self.tower_panel_pixels - 30))
 
-        time_text = self.small_font.render(f"{tower_type.firing_time} TIME", True, WHITE)
+        time_text = self.render_text(self.small_font, f"{tower_type.firing_time} TIME", WHITE)
         self.screen.blit(time_text, (position[0] + self.tile_pixels + 90, position[1] + self.tower_panel_pixels - 30))
 
-        range_text = self.small_font.render(f"{tower_type.max_range} RANGE", True, WHITE)
+        range_text = self.render_text(self.small_font, f"{tower_type.max_range} RANGE", WHITE)
         self.screen.blit(range_text, (position[0] + self.tile_pixels + 190, position[1] + self.tower_panel_pixels - 30))
 
         key_panel_position = (position[0] + self.menu_pixels - 45, position[1] + self.tower_panel_pixels - 35)
@@ -175,46 +336,51 @@ class Display:
         pygame.draw.rect(self.screen, GRAY, key_panel)
 
         key_text_position = (key_panel_position[0] + 5, key_panel_position[1])
-        key_text = self.regular_font.render(str(key), True, panel_colour)
+        key_text = self.render_text(self.regular_font, str(key), panel_colour)
         self.screen.blit(key_text, key_text_position)
 
     def draw_instructions(self, position):
-        title_text = self.regular_font.render("How to play", True, WHITE)
+        title_text = self.render_text(self.regular_font, "How to play", WHITE)
         self.screen.blit(title_text, (position[0], position[1]))
-        instruction_lines = [self.small_font.render("Move around using arrow keys", True, WHITE),
-                             self.small_font.render("Press 'P' to pause/unpause", True, WHITE),
-                             self.small_font.render("Use 1-4 keys to select a tower type", True, WHITE),
-                             self.small_font.render("Press the number again to build a tower", True, WHITE),
-                             self.small_font.render("Kill enemies to get more gold", True, WHITE),
-                             self.small_font.render("Don't let them reach the exit", True, WHITE),
-                             self.small_font.render("You lose if you run out of health!", True, WHITE),
-                             self.small_font.render("Finish all the waves to win", True, WHITE)]
+        instruction_lines = [self.render_text(self.small_font, line, WHITE) for line in INSTRUCTION_LINES]
         for i, line in enumerate(instruction_lines):
             self.screen.blit(line, (position[0], position[1] + 20 * (i+2)))
 
-    def draw_wave_counter(self, game_state: GameState):
+    def draw_wave_counter(self, frame: Frame):
+        remaining_enemies = frame.current_wave.total_amount + frame.enemy_count - frame.spawned
+        wave_counter_state = (frame.current_wave_id, remaining_enemies, self.next_spawn_seconds(frame))
+        if wave_counter_state == self.wave_counter_state:
+            return []
+        self.wave_counter_state = wave_counter_state
+
         counter_panel = pygame.Rect(self.pixels_width - self.counter_pixels, 0, self.counter_pixels, 50)
         pygame.draw.rect(self.screen, GRAY, counter_panel)
 
-        current_wave = game_state.current_wave_id + 1
-        total_waves = len(game_state.waves)
-        wave_counter_text = self.regular_font.render(f"Wave {current_wave}/{total_waves}", True, WHITE)
+        current_wave = frame.current_wave_id + 1
+        total_waves = len(frame.waves)
+        wave_counter_text = self.render_text(self.regular_font, f"Wave {current_wave}/{total_waves}", WHITE)
         self.screen.blit(wave_counter_text, (self.pixels_width - self.counter_pixels + 5, 10))
 
-        remaining_enemies = game_state.current_wave.total_amount + len(game_state.enemies) - \
-            game_state.current_wave.current_amount
-        total_enemies = game_state.current_wave.total_amount
-        enemy_counter_text = self.small_font.render(f"{remaining_enemies}/{total_enemies} enemies", True, WHITE)
+        total_enemies = frame.current_wave.total_amount
+        enemy_counter_text = self.render_text(self.small_font, f"{remaining_enemies}/{total_enemies} enemies", WHITE)
         self.screen.blit(enemy_counter_text, (self.pixels_width - self.counter_pixels + 5, 32))
         right_panel = pygame.Rect(self.pixels_width - self.counter_pixels, 50,
                                   self.counter_pixels, self.pixels_height - 50)
         pygame.draw.rect(self.screen, DARK_GRAY, right_panel)
-        for i, wave in enumerate(game_state.waves[game_state.current_wave_id: game_state.current_wave_id + 5]):
+        for i, wave in enumerate(frame.waves[frame.current_wave_id: frame.current_wave_id + 5]):
             self.draw_wave_info((self.pixels_width - self.counter_pixels, (i + 1) * 60),
-                                game_state.current_wave_id + i + 1, wave, game_state)
-
-    def draw_wave_info(self, position, number, wave: Wave, game_state: GameState):
-        if wave == game_state.current_wave:
+                                frame.current_wave_id + i + 1, wave, frame)
+        return [pygame.Rect(self.pixels_width - self.counter_pixels, 0, self.counter_pixels, self.pixels_height)]
+
+    @staticmethod
+    def next_spawn_seconds(frame: Frame):
+        ticks = frame.current_wave.ticks_until_spawn(frame.spawned, frame.wave_tick)
+        if ticks is None:
+            return None
+        return -(-ticks // TICKS_PER_SECOND)
+
+    def draw_wave_info(self, position, number, wave: Wave, frame: Frame):
+        if wave == frame.current_wave:
             panel_colour = LIGHT_GRAY
         else:
             panel_colour = GRAY
@@ -222,8 +388,8 @@ class Display:
         info_panel = pygame.Rect(*position, self.counter_pixels, 50)
         pygame.draw.rect(self.screen, panel_colour, info_panel)
 
-        wave_name_text = self.small_font.render(f"Wave {number}: {wave.enemy_type.name} x{wave.total_amount}",
-                                                True, WHITE)
+        wave_name = f"Wave {number}: {wave.enemy_type.name} x{wave.total_amount}"
+        wave_name_text = self.render_text(self.small_font, wave_name, WHITE)
         wave_name_text_rect = wave_name_text.get_rect(centerx=info_panel.centerx + 10, centery=info_panel.centery-10)
         self.screen.blit(wave_name_text, wave_name_text_rect)
 
@@ -234,38 +400,59 @@ class Display:
                 enemy_position = (position[0] + 5 + 2 * i, position[1] + 10 + 2 * i * (2 * (i % 2) - 1))
                 self.draw_enemy(enemy_position, wave.enemy_type.pixels, wave.enemy_type.colour)
 
-        health_text = self.tiny_font.render(f"{wave.enemy_type.health} HP", True, WHITE)
+        health_text = self.render_text(self.tiny_font, f"{wave.enemy_type.health} HP", WHITE)
         self.screen.blit(health_text, (position[0] + 10, position[1] + 30))
 
-        speed_text = self.tiny_font.render(f"{wave.enemy_type.speed} SPD", True, WHITE)
+        speed_text = self.render_text(self.tiny_font, f"{wave.enemy_type.speed} SPD", WHITE)
         self.screen.blit(speed_text, (position[0] + 50, position[1] + 30))
 
-        reward_text = self.tiny_font.render(f"{wave.enemy_type.reward} GOLD", True, WHITE)
+        reward_text = self.render_text(self.tiny_font, f"{wave.enemy_type.reward} GOLD", WHITE)
         self.screen.blit(reward_text, (position[0] + 110, position[1] + 30))
 
+        if wave == frame.current_wave:
+            next_spawn_seconds = self.next_spawn_seconds(frame)
+            if next_spawn_seconds is not None:
+                countdown_text = self.render_text(self.tiny_font, f"next in {next_spawn_seconds}s", YELLOW)
+                self.screen.blit(countdown_text, (position[0] + 110, position[1] + 2))
+
+    def draw_profile(self, profiler: Profiler, frame: Frame):
+        header = "stage".ljust(28) + "".join(f"p{p}".rjust(8) for p in PERCENTILES)
+        lines = [header]
+        for stage, values in zip(profiler.stages, profiler.percentiles().T):
+            lines.append(stage.ljust(28) + "".join(f"{value / 1e6:8.2f}" for value in values))
+        lines.append(f"{frame.enemy_count} enemies, {len(frame.towers)} towers, {len(frame.projectiles)} projectiles")
+
+        # The numbers change every frame, so these surfaces bypass the text cache.
+        line_surfaces = [self.tiny_font.render(line, True, WHITE) for line in lines]
+        line_height = self.tiny_font.get_linesize()
+        overlay_rect = pygame.Rect(self.menu_pixels, 0, max(surface.get_width() for surface in line_surfaces) + 8,
+                                   line_height * len(lines) + 8)
+        self.screen.fill(DARK_GRAY, overlay_rect)
+        for i, surface in enumerate(line_surfaces):
+            self.screen.blit(surface, (overlay_rect.x + 4, overlay_rect.y + 4 + i * line_height))
+        return overlay_rect
+
     def draw_pause(self):
-        pause_text1 = self.menu_font.render("Game is paused", True, PURPLE)
-        pause_text2 = self.menu_font.render("press 'P' to unpause", True, PURPLE)
+        pause_text1 = self.render_text(self.menu_font, "Game is paused", PURPLE)
+        pause_text2 = self.render_text(self.menu_font, "press 'P' to unpause", PURPLE)
         pause_text1_center = ((self.menu_pixels + self.pixels_width - self.counter_pixels)/ 2,
                               self.pixels_height / 2 - 30)
         pause_text2_center = ((self.menu_pixels + self.pixels_width - self.counter_pixels)/ 2,
                               self.pixels_height / 2 + 30)
         pause_text1_rect = pause_text1.get_rect(center=pause_text1_center)
         pause_text2_rect = pause_text2.get_rect(center=pause_text2_center)
-        self.screen.blit(pause_text1, pause_text1_rect)
-        self.screen.blit(pause_text2, pause_text2_rect)
-        pygame.display.flip()
+        return [self.screen.blit(pause_text1, pause_text1_rect), self.screen.blit(pause_text2, pause_text2_rect)]
 
     def draw_win(self):
         self.screen.fill(GRAY)
-        win_text = self.menu_font.render("You win! Congratulations!", True, WHITE)
+        win_text = self.render_text(self.menu_font, "You win! Congratulations!", WHITE)
         win_text_rect = win_text.get_rect(center=(self.pixels_width / 2, self.pixels_height / 2))
         self.screen.blit(win_text, win_text_rect)
         pygame.display.flip()
 
     def draw_loss(self):
         self.screen.fill(GRAY)
-        loss_text = self.menu_font.render("You lose :c Better luck next time!", True, WHITE)
+        loss_text = self.render_text(self.menu_font, "You lose :c Better luck next time!", WHITE)
         loss_text_rect = loss_text.get_rect(center=(self.pixels_width / 2, self.pixels_height / 2))
         self.screen.blit(loss_text, loss_text_rect)
         pygame.display.flip()
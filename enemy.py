@@ -1,9 +1,9 @@
-import math
-
-from numpy.random import default_rng
+from events import EventType
 
 
 class EnemyType:
+    __slots__ = ("name", "speed", "damage", "health", "reward", "pixels", "colour")
+
     def __init__(self, name, speed, damage, health, reward, pixels, colour):
         self.name = name
         self.speed = speed
@@ -15,46 +15,68 @@ class EnemyType:
 
 
 class Enemy:
-    def __init__(self, position, enemy_type: EnemyType):
-        rng = default_rng()
-        self.offset = [rng.uniform(-0.2, 0.2) for _ in range(2)]
-        self.position = list(position)
+    __slots__ = ("pool", "index", "serial", "enemy_type", "is_gone")
+
+    def __init__(self, pool, index, serial, enemy_type: EnemyType):
+        self.pool = pool
+        self.index = index
+        self.serial = serial
+        self.enemy_type = enemy_type
+        self.is_gone = False
 
-        self.speed = enemy_type.speed
-        self.damage = enemy_type.damage
-        self.max_health = enemy_type.health
-        self.health = enemy_type.health
-        self.reward = enemy_type.reward
+    @property
+    def speed(self):
+        return self.enemy_type.speed
 
-        self.pixels = enemy_type.pixels
-        self.colour = enemy_type.colour
+    @property
+    def damage(self):
+        return self.enemy_type.damage
 
-        self.node_at = 0
-        self.is_gone = False
+    @property
+    def max_health(self):
+        return self.enemy_type.health
+
+    @property
+    def reward(self):
+        return self.enemy_type.reward
+
+    @property
+    def pixels(self):
+        return self.enemy_type.pixels
+
+    @property
+    def colour(self):
+        return self.enemy_type.colour
+
+    @property
+    def position(self):
+        return self.pool.position[self.index]
+
+    @property
+    def offset(self):
+        return self.pool.offset[self.index]
+
+    @property
+    def health(self):
+        return self.pool.health[self.index]
 
-    def move_to(self, destination):
-        effective_destination = [destination[i]+self.offset[i] for i in range(2)]
-        difference_vector = [effective_destination[i]-self.position[i] for i in range(2)]
-        norm = math.sqrt(sum([i ** 2 for i in difference_vector]))
-        move_delta = [difference_vector[i] / norm * self.speed for i in range(2)]
-        if norm < self.speed:
-            self.node_at += 1
-        self.position[0] += move_delta[0]
-        self.position[1] += move_delta[1]
+    @property
+    def distance(self):
+        return self.pool.distance[self.index]
 
     def on_death(self, game_state):
-        game_state.gold += self.reward
-        game_state.enemies.remove(self)
+        reward = self.enemy_type.reward
+        game_state.gold += reward
+        game_state.events.emit(EventType.Kill, self.serial, reward)
+        game_state.events.emit(EventType.Gold, self.serial, reward)
+        self.pool.remove(self)
         self.is_gone = True
 
     def on_pass(self, game_state):
-        game_state.take_damage(self.damage)
-        game_state.enemies.remove(self)
+        game_state.take_damage(self.enemy_type.damage)
+        game_state.events.emit(EventType.Leak, self.serial, self.enemy_type.damage)
+        self.pool.remove(self)
         self.is_gone = True
 
     def damage_check(self, amount):
-        self.health -= amount
-        if self.health <= 0:
-            self.health = 0
-            return True
-        return False
+        return self.pool.damage(self, amount)
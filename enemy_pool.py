@@ -0,0 +1,102 @@
+import numpy as np
+
+from enemy import Enemy, EnemyType
+
+
+class EnemyPool:
+    ARRAYS = ("serial", "position", "offset", "speed", "health", "distance", "alive")
+
+    def __init__(self, capacity=64):
+        self.size = 0
+        self.dead_count = 0
+        self.spawned = 0
+        self.enemies = list()
+
+        self.serial = np.zeros(capacity, dtype=np.int64)
+        self.position = np.zeros((capacity, 2))
+        self.offset = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.health = np.zeros(capacity)
+        self.distance = np.zeros(capacity)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.size - self.dead_count
+
+    def grow(self):
+        capacity = 2 * len(self.alive)
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def spawn(self, position, offset, enemy_type: EnemyType):
+        if self.size == len(self.alive):
+            self.grow()
+        index = self.size
+        self.size += 1
+
+        self.serial[index] = self.spawned
+        self.position[index] = position
+        self.offset[index] = offset
+        self.speed[index] = enemy_type.speed
+        self.health[index] = enemy_type.health
+        self.distance[index] = 0
+        self.alive[index] = True
+
+        enemy = Enemy(self, index, self.spawned, enemy_type)
+        self.spawned += 1
+        self.enemies.append(enemy)
+        return enemy
+
+    def damage(self, enemy: Enemy, amount):
+        remaining = max(self.health[enemy.index] - amount, 0)
+        self.health[enemy.index] = remaining
+        return remaining == 0
+
+    def remove(self, enemy: Enemy):
+        self.alive[enemy.index] = False
+        self.dead_count += 1
+
+    def move(self, path_model):
+        size = self.size
+        distance = self.distance[:size]
+        distance += self.speed[:size]
+        self.position[:size] = path_model.positions_at(distance) + self.offset[:size]
+        return [self.enemies[i] for i in np.flatnonzero(self.alive[:size] & (distance >= path_model.total_length))]
+
+    def follow(self, flow_field):
+        # Each enemy heads for the centre of the tile after the one it stands on. It switches tiles half way across,
+        # so it never goes through a corner. With no single path to measure along, distance is minus the route left,
+        # which keeps the enemy nearest an exit the furthest along.
+        size = self.size
+        speed = self.speed[:size]
+        anchor = self.position[:size] - self.offset[:size]
+        tiles = flow_field.tile_indices(anchor)
+        next_tiles = flow_field.next_tile[tiles]
+        difference = flow_field.centres[next_tiles] - anchor
+        length = np.sqrt(difference[:, 0] * difference[:, 0] + difference[:, 1] * difference[:, 1])
+        step = np.minimum(speed, length)
+        anchor += difference * (step / np.maximum(length, 1e-9))[:, None]
+        self.position[:size] = anchor + self.offset[:size]
+        self.distance[:size] = -(flow_field.distance[next_tiles] + length - step)
+        arrived = (flow_field.distance[tiles] == 0) & (length <= speed)
+        return [self.enemies[i] for i in np.flatnonzero(self.alive[:size] & arrived)]
+
+    def compact(self):
+        if self.dead_count == 0:
+            return
+        size = self.size
+        keep = self.alive[:size].copy()
+        first_dead = int(np.argmin(keep))
+        for array in (getattr(self, name) for name in self.ARRAYS):
+            kept = array[first_dead:size][keep[first_dead:size]]
+            array[first_dead:first_dead + len(kept)] = kept
+        self.size -= self.dead_count
+        self.alive[self.size:size] = False
+        self.dead_count = 0
+
+        self.enemies = self.enemies[:first_dead] + [enemy for enemy in self.enemies[first_dead:] if not enemy.is_gone]
+        for index in range(first_dead, self.size):
+            self.enemies[index].index = index
@@ -0,0 +1,189 @@
+import argparse
+import math
+import time
+
+import numpy as np
+
+from path import PATH, PathModel
+from simulation import new_game_state
+from tile_grid import TileGrid
+from tower import TOWER_TYPES
+from wave import DEFAULT_WAVES
+
+
+class WaveEstimate:
+    def __init__(self, enemies, kills, leaks, gold, health):
+        self.enemies = enemies
+        self.kills = kills
+        self.leaks = leaks
+        self.gold = gold
+        self.health = health
+
+    @property
+    def survived(self):
+        return self.health > 0
+
+
+class Estimate:
+    def __init__(self, waves, health, gold):
+        self.waves = waves
+        self.health = health
+        self.gold = gold
+
+    @property
+    def game_won(self):
+        return self.health > 0
+
+    def __repr__(self):
+        outcome = "won" if self.game_won else f"lost in wave {len(self.waves)}"
+        return f"Estimate({outcome}, health={self.health}, gold={self.gold})"
+
+
+def tower_windows(tower_layout, path_model: PathModel):
+    # One window per stretch of path inside a tower's range, in the order an enemy walks into them. Projectiles are
+    # taken to fly half the tower's range.
+    windows = list()
+    for tower, (position, tower_type) in enumerate(tower_layout):
+        flight_ticks = 0 if tower_type.projectile_speed is None else \
+            tower_type.max_range / 2 / tower_type.projectile_speed
+        for start, end in path_model.coverage(tuple(position), tower_type.max_range):
+            windows.append((float(start), float(end), tower, tower_type.firing_time, tower_type.damage, flight_ticks,
+                            tower_type.splash_radius))
+    windows.sort()
+    return windows
+
+
+def estimate_wave(wave, windows, tower_count, path_length):
+    # Enemies walk the path at the same speed, so they keep their spawn order and the one spawned first is always the
+    # furthest along. Towers target the first enemy in range, so an enemy gets a tower's shots before any enemy behind
+    # it, starting when it walks in or when the tower has reloaded from its last shot at an earlier enemy, and until it
+    # walks out or dies. A tower only sees the kill once its last projectile lands, so it keeps firing at a doomed
+    # enemy for that long, and an enemy still escapes if it reaches the exit first. Splash also hits the enemies
+    # spawned close enough behind the target. Lateral offsets, ticks and the Sniper's strongest-first targeting are
+    # ignored.
+    enemy_type = wave.enemy_type
+    spawn_ticks = np.array(wave.spawn_ticks, dtype=float)
+    ready_at = [-math.inf] * tower_count
+    splash_damage = np.zeros(wave.total_amount)
+    killed = np.zeros(wave.total_amount, dtype=bool)
+    for enemy, spawn_tick in enumerate(wave.spawn_ticks):
+        health = enemy_type.health - splash_damage[enemy]
+        if health <= 0:
+            killed[enemy] = True
+            continue
+        exit_tick = spawn_tick + path_length / enemy_type.speed
+        for start, end, tower, firing_time, damage, flight_ticks, splash_radius in windows:
+            enter = spawn_tick + start / enemy_type.speed
+            leave = spawn_tick + end / enemy_type.speed
+            first_shot = max(enter, ready_at[tower])
+            if first_shot > leave:
+                continue
+            shots = min(math.floor((leave - first_shot) / firing_time) + 1, math.ceil(health / damage))
+            health -= shots * damage
+            ready_at[tower] = first_shot + shots * firing_time
+            if splash_radius > 0:
+                behind = slice(enemy + 1, np.searchsorted(spawn_ticks, spawn_tick + splash_radius / enemy_type.speed,
+                                                          side="right"))
+                splash_damage[behind] += shots * damage
+            if health <= 0:
+                ready_at[tower] += max(math.ceil(flight_ticks / firing_time) - 1, 0) * firing_time
+                killed[enemy] = first_shot + (shots - 1) * firing_time + flight_ticks <= exit_tick
+                break
+    return killed
+
+
+def estimate_layout(tower_layout, waves, path=PATH, health=20, gold=150):
+    path_model = PathModel(path)
+    windows = tower_windows(tower_layout, path_model)
+    gold -= sum(tower_type.price for _, tower_type in tower_layout)
+    estimates = list()
+    for wave in waves:
+        killed = estimate_wave(wave, windows, len(tower_layout), path_model.total_length)
+        enemy_type = wave.enemy_type
+        leaked = np.flatnonzero(~killed)
+        if len(leaked) * enemy_type.damage >= health:
+            # The game ends on the leak that takes health to zero, so only the enemies before it can pay out.
+            fatal_leak = -(-health // enemy_type.damage) - 1
+            killed = killed[:leaked[fatal_leak]]
+            leaked = leaked[:fatal_leak + 1]
+        kills = int(killed.sum())
+        health -= len(leaked) * enemy_type.damage
+        gold += kills * enemy_type.reward
+        estimates.append(WaveEstimate(wave.total_amount, kills, len(leaked), gold, health))
+        if health <= 0:
+            break
+    return Estimate(estimates, health, gold)
+
+
+def simulate_waves(tower_layout, waves, path=PATH, health=20, gold=150, seed=0):
+    game_state = new_game_state(tower_layout, waves, path=path, health=health, gold=gold, batched_towers=True,
+                                seed=seed)
+    wave_health = list()
+    while game_state.running:
+        wave_id = game_state.current_wave_id
+        game_state.tick()
+        if game_state.current_wave_id != wave_id or not game_state.running:
+            wave_health.append(game_state.health)
+    return game_state.game_won, game_state.health, game_state.gold, wave_health
+
+
+def random_layout(rng, free_tiles, gold):
+    layout = list()
+    names = list(TOWER_TYPES)
+    for tile in rng.permutation(len(free_tiles)):
+        tower_type = TOWER_TYPES[names[rng.integers(len(names))]]
+        if tower_type.price > gold:
+            break
+        gold -= tower_type.price
+        layout.append((tuple(int(value) for value in free_tiles[tile]), tower_type))
+    return layout
+
+
+def validate(count, waves=DEFAULT_WAVES, path=PATH, health=20, max_gold=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    free_tiles = TileGrid(12, 12, path).free_tiles()
+    outcome_matches = wave_matches = 0
+    health_errors, gold_errors, wave_errors = list(), list(), list()
+    estimate_time = simulation_time = 0.0
+    for _ in range(count):
+        gold = int(rng.integers(100, max_gold))
+        layout = random_layout(rng, free_tiles, gold)
+
+        start = time.perf_counter()
+        estimate = estimate_layout(layout, waves, path, health, gold)
+        estimate_time += time.perf_counter() - start
+        start = time.perf_counter()
+        game_won, final_health, final_gold, wave_health = simulate_waves(layout, waves, path, health, gold)
+        simulation_time += time.perf_counter() - start
+
+        outcome_matches += estimate.game_won == game_won
+        wave_matches += len(estimate.waves) == len(wave_health)
+        health_errors.append(abs(max(estimate.health, 0) - max(final_health, 0)))
+        gold_errors.append(abs(estimate.gold - final_gold))
+        for predicted, actual in zip(estimate.waves, wave_health):
+            wave_errors.append(abs(max(predicted.health, 0) - max(actual, 0)))
+
+    print(f"{count} layouts, outcome right {outcome_matches / count:.0%}, last wave right {wave_matches / count:.0%}, "
+          f"final health error {np.mean(health_errors):.2f}, gold error {np.mean(gold_errors):.1f}, "
+          f"per-wave health error {np.mean(wave_errors):.2f}")
+    print(f"estimator {estimate_time / count * 1000:.2f} ms per layout, "
+          f"simulation {simulation_time / count * 1000:.1f} ms per layout, "
+          f"{simulation_time / estimate_time:.0f}x faster")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estimate how a tower layout fares against the waves.")
+    parser.add_argument("--validate", type=int, default=None, metavar="COUNT",
+                        help="compare the estimate with the simulation on this many random layouts")
+    parser.add_argument("--seed", type=int, default=0)
+    arguments = parser.parse_args()
+
+    if arguments.validate is not None:
+        validate(arguments.validate, seed=arguments.seed)
+    else:
+        sample_layout = [((4, 2), TOWER_TYPES["Normal"]), ((7, 4), TOWER_TYPES["Heavy"])]
+        sample_estimate = estimate_layout(sample_layout, DEFAULT_WAVES)
+        print(sample_estimate)
+        for number, wave_estimate in enumerate(sample_estimate.waves, 1):
+            print(f"  wave {number}: {wave_estimate.kills}/{wave_estimate.enemies} killed, "
+                  f"{wave_estimate.leaks} leaked, health {wave_estimate.health}, gold {wave_estimate.gold}")
@@ -0,0 +1,101 @@
+from enum import Enum
+
+import numpy as np
+
+
+class EventType(Enum):
+    Spawn = 1
+    Hit = 2
+    Kill = 3
+    Leak = 4
+    Gold = 5
+    Wave = 6
+
+
+class EventQueue:
+    ARRAYS = ("kind", "target", "value", "segment")
+
+    def __init__(self, capacity=256):
+        self.size = 0
+        self.subscribers = list()
+
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.target = np.zeros(capacity, dtype=np.int64)
+        self.value = np.zeros(capacity)
+        self.segment = np.zeros((capacity, 4))
+
+    def __len__(self):
+        return self.size
+
+    def subscribe(self, consumer):
+        self.subscribers.append(consumer)
+
+    def reserve(self, count):
+        capacity = len(self.kind)
+        if self.size + count <= capacity:
+            return
+        while self.size + count > capacity:
+            capacity *= 2
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, name, grown)
+
+    def emit(self, event_type: EventType, target=-1, value=0.0, segment=None):
+        if self.size == len(self.kind):
+            self.reserve(1)
+        index = self.size
+        self.size += 1
+        self.kind[index] = event_type.value
+        self.target[index] = target
+        self.value[index] = value
+        if segment is not None:
+            self.segment[index] = segment
+
+    def emit_hits(self, targets, damage, starts, ends):
+        count = len(targets)
+        self.reserve(count)
+        events = slice(self.size, self.size + count)
+        self.size += count
+        self.kind[events] = EventType.Hit.value
+        self.target[events] = targets
+        self.value[events] = damage
+        self.segment[events, :2] = starts
+        self.segment[events, 2:] = ends
+
+    def dispatch(self):
+        for consumer in self.subscribers:
+            consumer(self)
+        self.size = 0
+
+    def clear(self):
+        self.size = 0
+
+
+class EventStats:
+    def __init__(self):
+        self.counts = np.zeros(len(EventType) + 1, dtype=np.int64)
+        self.damage_dealt = 0.0
+        self.gold_earned = 0
+        self.gold_spent = 0
+        self.health_lost = 0
+
+    def consume(self, events: EventQueue):
+        if events.size == 0:
+            return
+        kind, value = events.kind[:events.size], events.value[:events.size]
+        self.counts += np.bincount(kind, minlength=len(self.counts))
+        self.damage_dealt += float(value[kind == EventType.Hit.value].sum())
+        gold = value[kind == EventType.Gold.value]
+        self.gold_earned += int(gold[gold > 0].sum())
+        self.gold_spent -= int(gold[gold < 0].sum())
+        self.health_lost += int(value[kind == EventType.Leak.value].sum())
+
+    def count(self, event_type: EventType):
+        return int(self.counts[event_type.value])
+
+    def __repr__(self):
+        counts = ", ".join(f"{event_type.name.lower()}={self.count(event_type)}" for event_type in EventType)
+        return (f"EventStats({counts}, damage={self.damage_dealt:.0f}, gold_earned={self.gold_earned}, "
+                f"gold_spent={self.gold_spent}, health_lost={self.health_lost})")
@@ -0,0 +1,192 @@
+import heapq
+from collections import deque
+
+import numpy as np
+
+from tile_grid import TileGrid, EMPTY_TILE, PATH_TILE
+
+UNREACHABLE = np.iinfo(np.int32).max
+
+
+class FlowMap:
+    def __init__(self, spawns, exits, paths=(), mazing=False):
+        self.spawns = [tuple(spawn) for spawn in spawns]
+        self.exits = [tuple(exit_tile) for exit_tile in exits]
+        self.paths = [list(path) for path in paths]
+        self.mazing = mazing
+
+    def tiles(self):
+        # Spawns and exits are path tiles too, so nothing can be built on them even when mazing.
+        return [list(tile) for path in self.paths for tile in path] + [list(tile) for tile in self.spawns + self.exits]
+
+
+FORKED_MAP = FlowMap(
+    spawns=[(2, 0), (9, 0)], exits=[(9, 11), (5, 11)],
+    paths=[[[2, y] for y in range(7)] + [[x, 6] for x in range(3, 10)] + [[9, y] for y in range(7, 12)],
+           [[9, y] for y in range(4)] + [[x, 3] for x in range(8, 4, -1)] + [[5, y] for y in range(4, 12)]])
+
+
+def maze_map(width, height):
+    return FlowMap(spawns=[(width // 4, 0), (width - 1 - width // 4, 0)], exits=[(width // 2, height - 1)], mazing=True)
+
+
+class FlowField:
+    # Every walkable tile holds its route length to the nearest exit and the neighbouring tile to step onto next, so
+    # all enemies share one field however many there are. Tiles are numbered x * height + y, like the flattened grid.
+    def __init__(self, tile_grid: TileGrid, flow_map: FlowMap):
+        self.width = tile_grid.width
+        self.height = tile_grid.height
+        self.mazing = flow_map.mazing
+        self.exits = np.array([self.index(tile) for tile in flow_map.exits], dtype=np.int64)
+        self.spawns = np.array([self.index(tile) for tile in flow_map.spawns], dtype=np.int64)
+        self.centres = np.indices((self.width, self.height)).reshape(2, -1).T.astype(float)
+
+        neighbours = list()
+        for x in range(self.width):
+            for y in range(self.height):
+                index = self.index((x, y))
+                neighbours.append(tuple(index + step for step, inside in (
+                    (-self.height, x > 0), (self.height, x < self.width - 1), (-1, y > 0), (1, y < self.height - 1))
+                    if inside))
+        self.neighbours = neighbours
+
+        self.walkable = np.zeros(self.width * self.height, dtype=bool)
+        self.distance = np.full(self.width * self.height, UNREACHABLE, dtype=np.int32)
+        self.next_tile = np.arange(self.width * self.height)
+        self.version = -1
+        self.sync(tile_grid)
+
+    def index(self, tile):
+        return int(tile[0]) * self.height + int(tile[1])
+
+    def tile_indices(self, points):
+        tiles = np.rint(points).astype(np.int64)
+        return np.clip(tiles[:, 0], 0, self.width - 1) * self.height + np.clip(tiles[:, 1], 0, self.height - 1)
+
+    def is_walkable(self, tiles):
+        return tiles <= EMPTY_TILE if self.mazing else tiles == PATH_TILE
+
+    def sync(self, tile_grid: TileGrid):
+        if self.version == tile_grid.version:
+            return
+        changes = tile_grid.changes_since(max(self.version, 0))
+        if self.version < 0 or None in changes:
+            self.rebuild(tile_grid)
+        else:
+            for x, y in changes:
+                index = self.index((x, y))
+                walkable = bool(self.is_walkable(tile_grid[x, y]))
+                if walkable and not self.walkable[index]:
+                    self.unblock(index)
+                elif not walkable and self.walkable[index]:
+                    self.block((x, y))
+        self.version = tile_grid.version
+
+    def rebuild(self, tile_grid: TileGrid):
+        self.walkable[:] = self.is_walkable(tile_grid.tiles).ravel()
+        self.distance[:] = UNREACHABLE
+        exits = self.exits[self.walkable[self.exits]]
+        self.distance[exits] = 0
+
+        distance, walkable, neighbours = self.distance, self.walkable, self.neighbours
+        frontier = deque(int(index) for index in exits)
+        while frontier:
+            index = frontier.popleft()
+            step = distance[index] + 1
+            for neighbour in neighbours[index]:
+                if walkable[neighbour] and distance[neighbour] == UNREACHABLE:
+                    distance[neighbour] = step
+                    frontier.append(neighbour)
+        self.point(np.arange(len(distance)))
+
+    def point(self, tiles):
+        # Each tile steps onto the first neighbour, in a fixed order, that is one step nearer an exit. The field then
+        # comes out the same whether it was rebuilt or updated, so a replay restored from a snapshot walks the same.
+        x, y = tiles // self.height, tiles % self.height
+        distance = self.distance[tiles]
+        next_tile = tiles.copy()
+        for step, inside in reversed(((-self.height, x > 0), (self.height, x < self.width - 1), (-1, y > 0),
+                                      (1, y < self.height - 1))):
+            neighbour = np.where(inside, tiles + step, tiles)
+            nearer = inside & (self.distance[neighbour] == distance - 1)
+            next_tile[nearer] = neighbour[nearer]
+        self.next_tile[tiles] = next_tile
+
+    def relax(self, heap):
+        distance, walkable, neighbours = self.distance, self.walkable, self.neighbours
+        changed = list()
+        while heap:
+            step, index = heapq.heappop(heap)
+            if step > distance[index]:
+                continue
+            changed.append(index)
+            step += 1
+            for neighbour in neighbours[index]:
+                if walkable[neighbour] and distance[neighbour] > step:
+                    distance[neighbour] = step
+                    heapq.heappush(heap, (step, neighbour))
+        return changed
+
+    def unblock(self, index):
+        self.walkable[index] = True
+        if index in self.exits:
+            self.distance[index] = 0
+        else:
+            nearest = min(self.distance[neighbour] for neighbour in self.neighbours[index])
+            if nearest == UNREACHABLE:
+                return
+            self.distance[index] = nearest + 1
+        # Opening a tile only shortens routes, so the change spreads outwards from it and stops where it stops helping.
+        # The tiles next to the shortened ones may now have a nearer neighbour to step onto as well.
+        changed = self.relax([(int(self.distance[index]), index)])
+        self.point(np.unique([neighbour for tile_index in changed for neighbour in self.neighbours[tile_index]] +
+                             changed))
+
+    def block(self, tile, required=()):
+        # Only the tiles whose route ran through the blocked one can change: they are found by following next_tile
+        # backwards, cleared, and refilled from the untouched tiles around them. If a required tile is cut off from
+        # every exit, the field is put back and the tile stays open.
+        index = self.index(tile)
+        required = np.asarray(required, dtype=np.int64)
+        if np.any(required == index):
+            return False
+        if not self.walkable[index]:
+            return True
+        self.walkable[index] = False
+        if self.distance[index] == UNREACHABLE:
+            return True
+
+        region = [index]
+        for tile_index in region:
+            region.extend(neighbour for neighbour in self.neighbours[tile_index]
+                          if self.next_tile[neighbour] == tile_index)
+        region = np.array(region, dtype=np.int64)
+        saved_distance, saved_next_tile = self.distance[region], self.next_tile[region]
+        self.distance[region] = UNREACHABLE
+
+        heap = list()
+        distance = self.distance
+        for tile_index in region[1:].tolist():
+            nearest = min(distance[neighbour] for neighbour in self.neighbours[tile_index])
+            if nearest < UNREACHABLE:
+                distance[tile_index] = nearest + 1
+                heap.append((int(nearest) + 1, tile_index))
+        heapq.heapify(heap)
+        self.relax(heap)
+
+        if len(required) > 0 and (self.distance[required] == UNREACHABLE).any():
+            self.walkable[index] = True
+            self.distance[region] = saved_distance
+            self.next_tile[region] = saved_next_tile
+            return False
+        # Routes outside the region keep their length, so only the region's tiles can need a different next step.
+        self.point(region)
+        return True
+
+    def covered_tiles(self, centre, radius):
+        low_x, high_x = max(int(centre[0] - radius), 0), min(int(centre[0] + radius) + 1, self.width)
+        low_y, high_y = max(int(centre[1] - radius), 0), min(int(centre[1] + radius) + 1, self.height)
+        x, y = np.ogrid[low_x:high_x, low_y:high_y]
+        inside = (x - centre[0]) ** 2 + (y - centre[1]) ** 2 < radius ** 2
+        walkable = self.walkable.reshape(self.width, self.height)[low_x:high_x, low_y:high_y]
+        return int((inside & walkable).sum())
@@ -0,0 +1,186 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from game_state import GameState, TICKS_PER_SECOND
+
+MAX_SPEED = 0
+MAX_CATCH_UP_TICKS = 16
+MAX_SPEED_PUBLISH_INTERVAL = 1 / 120
+
+
+def read_only(array):
+    array.setflags(write=False)
+    return array
+
+
+class Frame:
+    __slots__ = ("time", "ticks", "running", "game_won", "paused", "map", "cursor", "selected_tower_type",
+                 "covered_tiles", "health", "gold", "waves", "current_wave_id", "current_wave", "spawned", "wave_tick",
+                 "enemy_serials", "enemy_positions", "enemy_health", "enemy_type_ids", "enemy_types", "towers",
+                 "projectiles")
+
+    @property
+    def enemy_count(self):
+        return len(self.enemy_serials)
+
+    def interpolate(self, previous, alpha):
+        # Positions are blended from the previous frame for enemies present in both, matched by serial. Serials are
+        # spawn order, which the enemy pool keeps, so they are sorted.
+        if previous is self or alpha >= 1 or len(previous.enemy_serials) == 0 or len(self.enemy_serials) == 0:
+            return self
+        match = np.minimum(np.searchsorted(previous.enemy_serials, self.enemy_serials), len(previous.enemy_serials) - 1)
+        found = previous.enemy_serials[match] == self.enemy_serials
+        positions = self.enemy_positions.copy()
+        start = previous.enemy_positions[match[found]]
+        positions[found] = start + (positions[found] - start) * max(alpha, 0.0)
+
+        frame = Frame()
+        for name in Frame.__slots__:
+            setattr(frame, name, getattr(self, name))
+        frame.enemy_positions = read_only(positions)
+        return frame
+
+
+def capture_frame(game_state: GameState, previous: Frame = None):
+    frame = Frame()
+    frame.time = time.perf_counter()
+    frame.ticks = game_state.ticks
+    frame.running = game_state.running
+    frame.game_won = game_state.game_won
+    frame.paused = game_state.paused
+    frame.cursor = tuple(game_state.cursor)
+    frame.selected_tower_type = game_state.selected_tower_type
+    frame.covered_tiles = None if game_state.selected_tower_type is None else \
+        game_state.covered_tiles(frame.cursor, game_state.selected_tower_type.max_range)
+    frame.health = game_state.health
+    frame.gold = game_state.gold
+    frame.waves = game_state.waves
+    frame.current_wave_id = game_state.current_wave_id
+    frame.current_wave = game_state.current_wave
+    frame.spawned = game_state.spawned
+    frame.wave_tick = game_state.wave_tick
+
+    # The map and the towers only change when a tower is placed or the game is rewound, so they are shared with the
+    # previous frame until then.
+    if previous is not None and previous.map.version == game_state.map.version:
+        frame.map = previous.map
+    else:
+        frame.map = game_state.map.copy()
+    if previous is not None and len(previous.towers) == len(game_state.towers) and frame.map is previous.map:
+        frame.towers = previous.towers
+    else:
+        frame.towers = tuple((tower.position, tower.colour) for tower in game_state.towers)
+
+    # move_enemies and tick_towers compact the pool, so between ticks the first size rows are the live enemies.
+    enemy_pool = game_state.enemy_pool
+    size = enemy_pool.size
+    enemies = enemy_pool.enemies
+    frame.enemy_serials = read_only(enemy_pool.serial[:size].copy())
+    frame.enemy_positions = read_only(enemy_pool.position[:size].copy())
+    enemy_types = list(dict.fromkeys(enemy.enemy_type for enemy in enemies))
+    frame.enemy_types = tuple(enemy_types)
+    if len(enemy_types) == 1:
+        frame.enemy_type_ids = read_only(np.zeros(size, dtype=np.int8))
+    else:
+        type_ids = {enemy_type: i for i, enemy_type in enumerate(enemy_types)}
+        frame.enemy_type_ids = read_only(np.fromiter((type_ids[enemy.enemy_type] for enemy in enemies),
+                                                     dtype=np.int8, count=size))
+    max_health = np.array([enemy_type.health for enemy_type in enemy_types], dtype=float)
+    frame.enemy_health = read_only(enemy_pool.health[:size] / max_health[frame.enemy_type_ids])
+    frame.projectiles = read_only(game_state.projectiles.segments())
+    return frame
+
+
+class FrameBuffer:
+    # Only the simulation thread publishes. It swaps in a new (previous, current) pair with a single reference
+    # assignment, which is atomic, so the renderer never takes a lock and always reads a consistent pair of frames
+    # that nothing writes to any more.
+    def __init__(self, frame: Frame):
+        self.frames = (frame, frame)
+
+    def publish(self, frame: Frame):
+        self.frames = (self.frames[1], frame)
+
+    def latest(self, now=None):
+        previous, current = self.frames
+        if current.ticks == previous.ticks:
+            return current
+        # The renderer runs one tick behind and blends towards the newest frame as its time slot passes.
+        now = time.perf_counter() if now is None else now
+        return current.interpolate(previous, (now - current.time) / max(current.time - previous.time, 1e-6))
+
+
+class SimulationThread(threading.Thread):
+    def __init__(self, game_state: GameState, recording=None):
+        super().__init__(name="simulation", daemon=True)
+        self.game_state = game_state
+        self.recording = recording
+        self.commands = queue.SimpleQueue()
+        self.buffer = FrameBuffer(capture_frame(game_state))
+        self.speed = 1
+        self.stopping = False
+
+    def perform(self, action, argument=None):
+        self.commands.put((action, argument))
+
+    def stop(self):
+        self.stopping = True
+        self.join()
+
+    def apply_commands(self):
+        applied = False
+        while True:
+            try:
+                action, argument = self.commands.get_nowait()
+            except queue.Empty:
+                return applied
+            applied = True
+            if action == "speed":
+                self.speed = argument
+            elif action == "rewind":
+                if self.recording is not None:
+                    self.recording.rewind(self.game_state, max(self.game_state.ticks - argument, 0))
+            else:
+                if self.recording is not None:
+                    self.recording.record(self.game_state, action, argument)
+                self.game_state.apply_action(action, argument)
+
+    def publish(self):
+        self.buffer.publish(capture_frame(self.game_state, self.buffer.frames[1]))
+
+    def tick(self):
+        self.game_state.tick()
+        if self.recording is not None:
+            self.recording.on_tick(self.game_state)
+
+    def run(self):
+        game_state = self.game_state
+        next_tick = time.perf_counter()
+        while not self.stopping and game_state.running:
+            speed = self.speed
+            if self.apply_commands():
+                self.publish()
+                if self.speed != speed:
+                    next_tick = time.perf_counter()
+            now = time.perf_counter()
+            if game_state.paused:
+                next_tick = now
+                time.sleep(1 / TICKS_PER_SECOND)
+            elif self.speed == MAX_SPEED:
+                publish_at = now + MAX_SPEED_PUBLISH_INTERVAL
+                while game_state.running and time.perf_counter() < publish_at:
+                    self.tick()
+                self.publish()
+            elif now < next_tick:
+                time.sleep(next_tick - now)
+            else:
+                period = 1 / (TICKS_PER_SECOND * self.speed)
+                self.tick()
+                self.publish()
+                next_tick += period
+                if now - next_tick > MAX_CATCH_UP_TICKS * period:
+                    next_tick = now
+        self.publish()
@@ -1,41 +1,94 @@
+import math
 from typing import Union
 
-from enemy import Enemy, EnemyType
-from tower import TowerType, Tower
+import numpy as np
+from numpy.random import default_rng
+
+from enemy import EnemyType
+from enemy_pool import EnemyPool
+from events import EventQueue, EventStats, EventType
+from flow_field import FlowMap, FlowField
+from offsets import OffsetStream
+from path import PathModel
+from projectiles import ProjectilePool
+from spatial import SpatialGrid, PathCoverageIndex
+from tile_grid import TileGrid, EMPTY_TILE, PATH_TILE
+from tower import TowerType, Tower, TOWER_TYPES
+from tower_batch import TowerBatch
+
+TICKS_PER_SECOND = 30
+ENEMY_OFFSET_SPREAD = 0.2
 
 
 class GameState:
-    def __init__(self, width, height, path, waves, health, gold):
+    def __init__(self, width, height, path, waves, health, gold, batched_towers=False, seed=None):
         self.game_won = False
         self.running = True
         self.paused = True
+        self.ticks = 0
 
         self.width = width
         self.height = height
 
+        # A FlowMap has several spawns and exits and enemies follow a flow field over the map, which towers block when
+        # mazing. Otherwise path is a single list of tiles, walked from its first node to its last.
         self.path = path
-        self.map = [[-1 if [i, j] in self.path else 0 for j in range(self.height)] for i in range(self.width)]
+        if isinstance(path, FlowMap):
+            self.path_model = None
+            self.map = TileGrid(width, height, path.tiles())
+            self.flow_field = FlowField(self.map, path)
+        else:
+            self.path_model = PathModel(path, width, height)
+            self.map = TileGrid(width, height, path)
+            self.flow_field = None
 
         self.waves = waves
         self.current_wave_id = 0
         self.current_wave = waves[0]
-        self.enemies = list()
+        self.wave_tick = 0
+        self.spawned = 0
+        self.seed = seed
+        self.rng = default_rng(seed)
+        self.enemy_offsets = OffsetStream(self.rng, ENEMY_OFFSET_SPREAD)
+        self.enemy_pool = EnemyPool()
+        self.enemy_index = SpatialGrid() if self.flow_field is not None else \
+            PathCoverageIndex(self.path_model, ENEMY_OFFSET_SPREAD * math.sqrt(2))
 
         self.health = health
         self.gold = gold
         self.cursor = [width//2, height//2]
         self.selected_tower_type: Union[TowerType, None] = None
         self.towers = list()
-        self.projectiles = list()
+        self.tower_batch = TowerBatch() if batched_towers else None
+        self.projectiles = ProjectilePool()
+        self.events = EventQueue()
+        self.stats = EventStats()
+        self.events.subscribe(self.stats.consume)
+
+    @property
+    def enemies(self):
+        return self.enemy_pool.enemies
+
+    def covered_tiles(self, centre, radius):
+        if self.flow_field is not None:
+            return self.flow_field.covered_tiles(centre, radius)
+        return self.path_model.covered_tiles(centre, radius)
+
+    def route_tiles(self):
+        # The tiles that must keep a route to an exit: every spawn and every tile an enemy is on.
+        enemy_pool = self.enemy_pool
+        alive = enemy_pool.alive[:enemy_pool.size]
+        anchors = enemy_pool.position[:enemy_pool.size][alive] - enemy_pool.offset[:enemy_pool.size][alive]
+        return np.concatenate((self.flow_field.spawns, self.flow_field.tile_indices(anchors)))
 
     def cursor_move(self, vector):
         self.cursor[0] = (self.cursor[0] + vector[0]) % self.width
         self.cursor[1] = (self.cursor[1] + vector[1]) % self.height
 
     def set_tile(self, value):
-        if self.map[self.cursor[1]][self.cursor[0]] < 0:
+        if self.map[self.cursor[0], self.cursor[1]] == PATH_TILE:
             return
-        self.map[self.cursor[1]][self.cursor[0]] = value
+        self.map.set(self.cursor, value)
 
     def take_damage(self, value):
         self.health -= value
@@ -50,24 +103,32 @@ class GameState:
         self.running = False
 
     def spawn_enemy(self, enemy_type: EnemyType):
-        self.enemies.append(Enemy([self.path[0][0], self.path[0][1]], enemy_type))
-        pass
+        offset = self.enemy_offsets.draw()
+        if self.flow_field is not None:
+            spawns = self.flow_field.spawns
+            start = self.flow_field.centres[spawns[self.enemy_pool.spawned % len(spawns)]]
+        else:
+            start = self.path_model.nodes[0]
+        enemy = self.enemy_pool.spawn(start + offset, offset, enemy_type)
+        self.events.emit(EventType.Spawn, enemy.serial, enemy_type.health)
 
     def move_enemies(self):
-        enemies_to_delete = list()
-        for enemy in self.enemies:
-            if enemy.node_at == len(self.path) - 1:
-                enemies_to_delete.append(enemy)
-            else:
-                enemy.move_to(self.path[enemy.node_at + 1])
-        for enemy in enemies_to_delete:
+        if self.flow_field is not None:
+            self.flow_field.sync(self.map)
+            passed = self.enemy_pool.follow(self.flow_field)
+        else:
+            passed = self.enemy_pool.move(self.path_model)
+        for enemy in passed:
             enemy.on_pass(self)
+        self.enemy_pool.compact()
 
     def tick_wave(self):
-        tick_result = next(self.current_wave.enemy_to_spawn())
-        if tick_result is not None:
-            self.spawn_enemy(tick_result)
-        if self.current_wave.current_amount == self.current_wave.total_amount and len(self.enemies) == 0:
+        spawn_ticks = self.current_wave.spawn_ticks
+        while self.spawned < len(spawn_ticks) and spawn_ticks[self.spawned] <= self.wave_tick:
+            self.spawn_enemy(self.current_wave.enemy_type)
+            self.spawned += 1
+        self.wave_tick += 1
+        if self.spawned == len(spawn_ticks) and len(self.enemies) == 0:
             if self.current_wave_id == len(self.waves) - 1:
                 if self.running:
                     self.on_win()
@@ -75,16 +136,87 @@ class GameState:
             else:
                 self.current_wave_id += 1
                 self.current_wave = self.waves[self.current_wave_id]
+                self.events.emit(EventType.Wave, value=self.current_wave_id)
+                self.wave_tick = 0
+                self.spawned = 0
+
+    def place_tower(self, position, tower_type: TowerType):
+        if self.map[position[0], position[1]] != EMPTY_TILE or self.gold < tower_type.price:
+            return None
+        if self.flow_field is not None and self.flow_field.mazing:
+            # The field only syncs as enemies move, so it may still reflect the grid before a snapshot was restored.
+            self.flow_field.sync(self.map)
+            if not self.flow_field.block(position, self.route_tiles()):
+                return None
+        self.gold -= tower_type.price
+        self.events.emit(EventType.Gold, value=-tower_type.price)
+        tower = Tower((position[0], position[1]), tower_type, len(self.towers))
+        self.towers.append(tower)
+        if self.tower_batch is not None:
+            self.tower_batch.add(tower)
+        self.map.set(position, tower_type.base_colour_id)
+        return tower
 
     def buy_tower(self):
-        if self.map[self.cursor[0]][self.cursor[1]] != 0 or self.gold < self.selected_tower_type.price:
+        if self.place_tower(self.cursor, self.selected_tower_type) is None:
             return
-        self.gold -= self.selected_tower_type.price
-        self.towers.append(Tower((self.cursor[0], self.cursor[1]), self.selected_tower_type))
-        self.map[self.cursor[0]][self.cursor[1]] = self.selected_tower_type.base_colour_id
         self.selected_tower_type = None
 
     def tick_towers(self):
-        self.projectiles.clear()
-        for tower in self.towers:
-            tower.tick(self)
+        if self.tower_batch is not None:
+            self.tower_batch.tick(self)
+        else:
+            self.enemy_index.rebuild(self.enemy_pool)
+            for tower in self.towers:
+                tower.tick(self)
+        self.enemy_pool.compact()
+
+    def tick_projectiles(self):
+        self.projectiles.tick(self)
+
+    def damage_enemies(self, towers, targets, damage, starts):
+        enemy_pool = self.enemy_pool
+        hit = np.unique(targets)
+        health_before = enemy_pool.health[hit]
+        np.subtract.at(enemy_pool.health, targets, damage)
+        enemy_pool.health[hit] = np.maximum(enemy_pool.health[hit], 0)
+        self.events.emit_hits(enemy_pool.serial[targets], damage, starts, enemy_pool.position[targets])
+
+        # Hits are listed in the order they land, and the one that takes an enemy's health to zero gets the kill.
+        killed = dict()
+        remaining = dict(zip(hit.tolist(), health_before.tolist()))
+        for tower, target, amount in zip(towers.tolist(), targets.tolist(), damage.tolist()):
+            if remaining[target] > 0:
+                remaining[target] -= amount
+                if remaining[target] <= 0:
+                    killed[target] = tower
+        for target, tower in killed.items():
+            enemy_pool.enemies[target].on_death(self)
+            self.towers[tower].kills += 1
+            if self.tower_batch is not None:
+                self.tower_batch.kills[tower] += 1
+
+    def apply_action(self, action, argument=None):
+        if action == "move":
+            self.cursor_move(argument)
+        elif action == "select":
+            self.selected_tower_type = TOWER_TYPES[argument]
+        elif action == "buy":
+            self.buy_tower()
+        elif action == "choose":
+            if self.selected_tower_type == TOWER_TYPES[argument]:
+                self.buy_tower()
+            else:
+                self.selected_tower_type = TOWER_TYPES[argument]
+        elif action == "pause":
+            self.paused = not self.paused
+        else:
+            raise ValueError(f"Unknown action {action}")
+
+    def tick(self):
+        self.move_enemies()
+        self.tick_projectiles()
+        self.tick_towers()
+        self.tick_wave()
+        self.ticks += 1
+        self.events.dispatch()
@@ -1,55 +1,172 @@
+import time
+
+STARTUP_START = time.perf_counter()
+
+import argparse
+
 import pygame
 
 from display import Display
-from game_state import GameState
-from tower import Normal, MachineGun, Sniper, Heavy
+from flow_field import FORKED_MAP, maze_map
+from frame import Frame, SimulationThread, capture_frame, MAX_SPEED
+from game_state import GameState, TICKS_PER_SECOND
+from path import PATH
+from profiler import Profiler, GAME_STAGES, DRAW_STAGES
+from replay import Recording
 from wave import DEFAULT_WAVES, TEST_WAVES
 
 MOVEMENT_TILES_DICT = {pygame.K_UP: [0, -1], pygame.K_DOWN: [0, 1], pygame.K_LEFT: [-1, 0], pygame.K_RIGHT: [1, 0]}
-VALUE_TOWER_DICT = {pygame.K_1: Normal,
-                    pygame.K_2: Heavy,
-                    pygame.K_3: MachineGun,
-                    pygame.K_4: Sniper}
+VALUE_TOWER_DICT = {pygame.K_1: "Normal",
+                    pygame.K_2: "Heavy",
+                    pygame.K_3: "MachineGun",
+                    pygame.K_4: "Sniper"}
+SPEED_KEYS_DICT = {pygame.K_q: 1, pygame.K_w: 2, pygame.K_e: 4, pygame.K_r: MAX_SPEED}
+
+FRAMES_PER_SECOND = 30
+MAX_TICKS_PER_FRAME = 16
+MAX_SKIPPED_FRAMES = 5
+MAX_SPEED_FRAME_SHARE = 0.8
+REWIND_SECONDS = 10
+MAPS = {"path": PATH, "forked": FORKED_MAP, "maze": maze_map(12, 12)}
+
+
+class StartupReport:
+    def __init__(self, start):
+        self.stages = [("start", start)]
 
-PATH = [[3, -1], [3, 0], [3, 1], [3, 2], [3, 3], [4, 3], [5, 3], [6, 3], [7, 3], [8, 3], [8, 4], [8, 5], [8, 6], [8, 7],
-        [8, 8], [7, 8], [6, 8], [6, 9], [6, 10], [6, 11], [6, 12]]
+    def mark(self, stage):
+        self.stages.append((stage, time.perf_counter()))
+
+    def __str__(self):
+        start = self.stages[0][1]
+        lines = [f"{'stage':<16}{'step ms':>10}{'total ms':>10}"]
+        for (_, previous), (stage, moment) in zip(self.stages, self.stages[1:]):
+            lines.append(f"{stage:<16}{(moment - previous) * 1000:>10.1f}{(moment - start) * 1000:>10.1f}")
+        return "\n".join(lines)
 
 
 class App:
     def __init__(self, width, height, path, waves, tile_pixels, menu_pixels,
-                 tower_panel_pixels, counter_pixels, health, gold):
+                 tower_panel_pixels, counter_pixels, health, gold, seed=None, profiler: Profiler = None,
+                 trace_path=None, recording_path=None, startup_report: StartupReport = None, threaded=False,
+                 frames_per_second=FRAMES_PER_SECOND):
         self.running = True
+        self.speed = 1
+        self.accumulator = 0.0
+        self.skipped_frames = 0
+        self.frames_per_second = frames_per_second
+        self.startup_report = startup_report
         self.display = Display(width, height, tile_pixels, menu_pixels, tower_panel_pixels, counter_pixels)
-        self.game_state = GameState(width, height, path, waves, health, gold)
+        self.mark_startup("display")
+        self.game_state = GameState(width, height, path, waves, health, gold, seed=seed)
+        self.mark_startup("game state")
+        self.profiler = profiler
+        self.trace_path = trace_path
+        self.show_profile = profiler is not None
+        self.recording_path = recording_path
+        self.recording = None if recording_path is None else Recording(self.game_state)
+        self.simulation = SimulationThread(self.game_state, self.recording) if threaded else None
+        self.frame: Frame = capture_frame(self.game_state)
+        if profiler is not None:
+            profiler.instrument(self.game_state, GAME_STAGES)
+            profiler.instrument(self.display, DRAW_STAGES)
+
+    def mark_startup(self, stage):
+        if self.startup_report is not None:
+            self.startup_report.mark(stage)
 
-    @staticmethod
-    def on_init():
+    def on_init(self):
         pygame.init()
+        self.mark_startup("pygame init")
 
     def on_event(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key in MOVEMENT_TILES_DICT.keys():
-                self.game_state.cursor_move(MOVEMENT_TILES_DICT[event.key])
+                self.perform("move", MOVEMENT_TILES_DICT[event.key])
             elif event.key in VALUE_TOWER_DICT.keys():
-                if self.game_state.selected_tower_type == VALUE_TOWER_DICT[event.key]:
-                    self.game_state.buy_tower()
-                else:
-                    self.game_state.selected_tower_type = VALUE_TOWER_DICT[event.key]
+                self.perform("choose", VALUE_TOWER_DICT[event.key])
             elif event.key == pygame.K_p:
-                self.game_state.paused = not self.game_state.paused
+                self.perform("pause")
+            elif event.key in SPEED_KEYS_DICT.keys():
+                self.speed = SPEED_KEYS_DICT[event.key]
+                self.accumulator = 0.0
+                if self.simulation is not None:
+                    self.simulation.perform("speed", self.speed)
+            elif event.key == pygame.K_F3 and self.profiler is not None:
+                self.show_profile = not self.show_profile
+            elif event.key == pygame.K_BACKSPACE and self.recording is not None:
+                if self.simulation is not None:
+                    self.simulation.perform("rewind", REWIND_SECONDS * TICKS_PER_SECOND)
+                else:
+                    rewind_tick = max(self.game_state.ticks - REWIND_SECONDS * TICKS_PER_SECOND, 0)
+                    self.recording.rewind(self.game_state, rewind_tick)
         if event.type == pygame.QUIT:
             pygame.quit()
 
+    def perform(self, action, argument=None):
+        if self.simulation is not None:
+            self.simulation.perform(action, argument)
+            return
+        if self.recording is not None:
+            self.recording.record(self.game_state, action, argument)
+        self.game_state.apply_action(action, argument)
+
     def on_loop(self):
         if not self.game_state.paused:
-            self.game_state.move_enemies()
-            self.game_state.tick_towers()
-            self.game_state.tick_wave()
+            self.game_state.tick()
+            if self.recording is not None:
+                self.recording.on_tick(self.game_state)
+
+    def on_frame(self, elapsed):
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        frame_start = time.perf_counter()
+        if self.simulation is not None:
+            # The simulation thread keeps time on its own, so every frame is drawn from the latest published state.
+            self.frame = self.simulation.buffer.latest(frame_start)
+            self.on_render()
+            if self.profiler is not None:
+                self.profiler.end_frame(self.frame)
+            return
+        if self.game_state.paused:
+            self.accumulator = 0.0
+        elif self.speed == MAX_SPEED:
+            frame_end = frame_start + MAX_SPEED_FRAME_SHARE / self.frames_per_second
+            while self.game_state.running and time.perf_counter() < frame_end:
+                self.on_loop()
+        else:
+            self.accumulator += elapsed * self.speed
+            ticks = 0
+            while self.game_state.running and self.accumulator >= 1 / TICKS_PER_SECOND and ticks < MAX_TICKS_PER_FRAME:
+                self.on_loop()
+                self.accumulator -= 1 / TICKS_PER_SECOND
+                ticks += 1
+            if ticks == MAX_TICKS_PER_FRAME:
+                self.accumulator = 0.0
+
+        over_budget = self.speed != MAX_SPEED and time.perf_counter() - frame_start > 1 / self.frames_per_second
+        if over_budget and self.skipped_frames < MAX_SKIPPED_FRAMES:
+            self.skipped_frames += 1
+        else:
+            self.skipped_frames = 0
+            self.frame = capture_frame(self.game_state, self.frame)
+            self.on_render()
+        if self.profiler is not None:
+            self.profiler.end_frame(self.frame)
 
     def on_render(self):
-        self.display.draw(self.game_state)
+        self.display.draw(self.frame, self.profiler if self.show_profile else None)
+
+    def game_running(self):
+        return self.frame.running if self.simulation is not None else self.game_state.running
 
     def on_cleanup(self):
+        if self.simulation is not None:
+            self.simulation.stop()
+        if self.trace_path is not None:
+            self.profiler.dump(self.trace_path)
+        if self.recording is not None:
+            self.recording.save(self.recording_path)
         if self.game_state.game_won:
             self.display.draw_win()
         else:
@@ -58,12 +175,20 @@ class App:
     def on_execute(self):
         self.on_init()
         clock = pygame.time.Clock()
-        while self.game_state.running:
+        previous_frame = time.perf_counter()
+        if self.simulation is not None:
+            self.simulation.start()
+        while self.game_running():
             for event in pygame.event.get():
                 self.on_event(event)
-            self.on_loop()
-            self.on_render()
-            clock.tick(30)
+            frame_start = time.perf_counter()
+            self.on_frame(frame_start - previous_frame)
+            previous_frame = frame_start
+            if self.startup_report is not None:
+                self.mark_startup("first frame")
+                print(self.startup_report)
+                self.startup_report = None
+            clock.tick(self.frames_per_second)
         self.on_cleanup()
         while self.running:
             for event in pygame.event.get():
@@ -72,5 +197,24 @@ class App:
 
 
 if __name__ == "__main__":
-    app = App(12, 12, PATH, DEFAULT_WAVES, 50, 400, 80, 160, 20, 150)
+    parser = argparse.ArgumentParser(description="Play Tower Defence.")
+    parser.add_argument("--profile", action="store_true", help="time each subsystem, F3 toggles the overlay")
+    parser.add_argument("--trace", default=None, help="JSON or CSV file to dump the profile to on exit")
+    parser.add_argument("--record", default=None, help="file to save the game's inputs to, backspace rewinds")
+    parser.add_argument("--startup-report", action="store_true", help="print how long each startup step took")
+    parser.add_argument("--threaded", action="store_true", help="run the game on its own thread, apart from drawing")
+    parser.add_argument("--fps", type=int, default=FRAMES_PER_SECOND, help="frames drawn per second")
+    parser.add_argument("--map", choices=tuple(MAPS), default="path",
+                        help="forked has two spawns and two exits, maze lets towers wall the enemies' route")
+    arguments = parser.parse_args()
+
+    startup = None
+    if arguments.startup_report:
+        startup = StartupReport(STARTUP_START)
+        startup.mark("imports")
+
+    profiler = Profiler() if arguments.profile or arguments.trace else None
+    app = App(12, 12, MAPS[arguments.map], DEFAULT_WAVES, 50, 400, 80, 160, 20, 150, profiler=profiler,
+              trace_path=arguments.trace, recording_path=arguments.record, startup_report=startup,
+              threaded=arguments.threaded, frames_per_second=arguments.fps)
     app.on_execute()
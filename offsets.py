@@ -0,0 +1,18 @@
+import numpy as np
+
+
+class OffsetStream:
+    def __init__(self, rng, spread, block_size=256):
+        self.rng = rng
+        self.spread = spread
+        self.block_size = block_size
+        self.block = np.zeros((0, 2))
+        self.next_offset = 0
+
+    def draw(self):
+        if self.next_offset == len(self.block):
+            self.block = self.rng.uniform(-self.spread, self.spread, (self.block_size, 2))
+            self.next_offset = 0
+        offset = self.block[self.next_offset]
+        self.next_offset += 1
+        return offset
@@ -0,0 +1,178 @@
+import argparse
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from path import PATH, PathModel
+from simulation import new_game_state
+from tile_grid import TileGrid
+from tower import TOWER_TYPES
+from wave import DEFAULT_WAVES
+
+INVALID_SCORE = (-1, 0, 0, 0)
+
+
+class GameConfig:
+    def __init__(self, waves, width=12, height=12, path=PATH, health=20, gold=150, seed=0):
+        self.waves = waves
+        self.width = width
+        self.height = height
+        self.path = path
+        self.health = health
+        self.gold = gold
+        self.seed = seed
+
+
+def play_build_order(build_order, config: GameConfig, prune_below=None):
+    game_state = new_game_state([], config.waves, config.width, config.height, config.path, config.health, config.gold,
+                                batched_towers=True, seed=config.seed)
+    bought = 0
+    spare_gold = -1
+    while game_state.running:
+        while bought < len(build_order) and game_state.gold >= TOWER_TYPES[build_order[bought][2]].price:
+            x, y, name = build_order[bought]
+            if game_state.place_tower((x, y), TOWER_TYPES[name]) is None:
+                return INVALID_SCORE, None
+            bought += 1
+        if bought == len(build_order):
+            spare_gold = max(spare_gold, game_state.gold)
+        game_state.tick()
+        if prune_below is not None and game_state.health < prune_below:
+            spare_gold = None
+            break
+    if spare_gold is not None and bought == len(build_order):
+        spare_gold = max(spare_gold, game_state.gold)
+
+    # Lost games rank by how long they lasted, won games by health and then by the gold left over.
+    score = (int(game_state.game_won), game_state.health, 0 if game_state.game_won else game_state.ticks,
+             game_state.gold)
+    return score, spare_gold
+
+
+def evaluate_job(job):
+    build_order, config, prune_below = job
+    return play_build_order(build_order, config, prune_below)
+
+
+# Layouts are build orders of (x, y, tower name) tuples, which hash the same however they were produced.
+class LayoutCache:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, layout):
+        result = self.results.get(layout)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(layout)
+        return result
+
+    def put(self, layout, result):
+        self.results[layout] = result
+        self.results.move_to_end(layout)
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+
+class PlacementOptimizer:
+    def __init__(self, config: GameConfig, tower_names=tuple(TOWER_TYPES), tiles_per_type=12, cache_size=4096,
+                 workers=None):
+        self.config = config
+        self.cache = LayoutCache(cache_size)
+        self.workers = workers or os.cpu_count()
+        self.best = None
+        self.best_score = INVALID_SCORE
+        self.skipped = 0
+
+        # Only tiles whose range actually reaches the path are worth trying, best covered first.
+        path_model = PathModel(config.path, config.width, config.height)
+        free_tiles = TileGrid(config.width, config.height, config.path).free_tiles()
+        self.candidate_tiles = dict()
+        for name in tower_names:
+            max_range = TOWER_TYPES[name].max_range
+            coverage = [(path_model.covered_tiles((int(x), int(y)), max_range), int(x), int(y)) for x, y in free_tiles]
+            coverage.sort(key=lambda entry: -entry[0])
+            self.candidate_tiles[name] = [(x, y) for covered, x, y in coverage[:tiles_per_type] if covered > 0]
+
+    def prune_threshold(self):
+        # A candidate that drops below the incumbent's health can at best win with less health, so it cannot beat it.
+        return self.best_score[1] if self.best_score[0] == 1 else None
+
+    def lookup(self, layout):
+        result = self.cache.get(layout)
+        if result is not None or len(layout) == 0:
+            return result
+        # The spare gold of a build order is the most gold it ever held once everything in it was bought (-1 when it
+        # never got there). A tower costing more than that is never bought, so the game is the same as the parent's.
+        parent = self.cache.results.get(layout[:-1])
+        if parent is not None and parent[1] is not None and TOWER_TYPES[layout[-1][2]].price > parent[1]:
+            self.cache.put(layout, parent)
+            self.skipped += 1
+            return parent
+        return None
+
+    def evaluate(self, layouts, executor):
+        results = [self.lookup(layout) for layout in layouts]
+        missing = [i for i, result in enumerate(results) if result is None]
+        prune_below = self.prune_threshold()
+        jobs = [(layouts[i], self.config, prune_below) for i in missing]
+        chunksize = max(1, len(jobs) // (self.workers * 4))
+        for i, result in zip(missing, executor.map(evaluate_job, jobs, chunksize=chunksize)):
+            results[i] = result
+            self.cache.put(layouts[i], result)
+        scores = [score for score, _ in results]
+        for layout, score in zip(layouts, scores):
+            if score > self.best_score:
+                self.best, self.best_score = layout, score
+        return scores
+
+    def extensions(self, layout):
+        occupied = {(x, y) for x, y, _ in layout}
+        return [layout + ((x, y, name),) for name, tiles in self.candidate_tiles.items()
+                for x, y in tiles if (x, y) not in occupied]
+
+    def search(self, max_towers, beam_width=1, progress=True):
+        beam = [()]
+        with ProcessPoolExecutor(self.workers) as executor:
+            self.evaluate(beam, executor)
+            for step in range(max_towers):
+                start = time.perf_counter()
+                previous_best = self.best_score
+                candidates = list(dict.fromkeys(extension for layout in beam for extension in self.extensions(layout)))
+                if not candidates:
+                    break
+                scores = self.evaluate(candidates, executor)
+                ranked = sorted(zip(scores, candidates), key=lambda entry: entry[0], reverse=True)
+                beam = [layout for score, layout in ranked[:beam_width] if score != INVALID_SCORE]
+                if progress:
+                    print(f"step {step + 1}: {len(candidates)} candidates, best {self.best_score}, "
+                          f"{self.cache.hits} cache hits, {self.skipped} never bought, "
+                          f"{time.perf_counter() - start:.1f}s")
+                if self.best_score <= previous_best:
+                    break
+        return self.best, self.best_score
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search tower build orders for the default map and waves.")
+    parser.add_argument("--gold", type=int, default=150)
+    parser.add_argument("--health", type=int, default=20)
+    parser.add_argument("--towers", type=int, default=8, help="maximum number of towers to buy")
+    parser.add_argument("--beam", type=int, default=1, help="beam width, 1 is a greedy search")
+    parser.add_argument("--tiles", type=int, default=12, help="candidate tiles per tower type")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    optimizer = PlacementOptimizer(GameConfig(DEFAULT_WAVES, health=arguments.health, gold=arguments.gold,
+                                              seed=arguments.seed),
+                                   tiles_per_type=arguments.tiles, workers=arguments.workers)
+    best_layout, best_score = optimizer.search(arguments.towers, arguments.beam)
+    print(f"best score {best_score}")
+    for x, y, name in best_layout:
+        print(f"  buy {name} at ({x}, {y})")
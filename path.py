@@ -0,0 +1,62 @@
+import numpy as np
+
+PATH = [[3, -1], [3, 0], [3, 1], [3, 2], [3, 3], [4, 3], [5, 3], [6, 3], [7, 3], [8, 3], [8, 4], [8, 5], [8, 6], [8, 7],
+        [8, 8], [7, 8], [6, 8], [6, 9], [6, 10], [6, 11], [6, 12]]
+
+
+class PathModel:
+    def __init__(self, path, width=None, height=None):
+        self.nodes = np.array(path, dtype=float)
+        # Path nodes are tiles, and the ones off the board are where enemies enter and leave.
+        self.on_board = np.ones(len(self.nodes), dtype=bool)
+        if width is not None:
+            self.on_board = (self.nodes[:, 0] >= 0) & (self.nodes[:, 0] < width) & \
+                (self.nodes[:, 1] >= 0) & (self.nodes[:, 1] < height)
+        segments = np.diff(self.nodes, axis=0)
+        self.lengths = np.sqrt(segments[:, 0] * segments[:, 0] + segments[:, 1] * segments[:, 1])
+        self.directions = segments / self.lengths[:, None]
+        self.arc_length = np.concatenate(([0.0], np.cumsum(self.lengths)))
+        self.total_length = self.arc_length[-1]
+        self.coverage_cache = dict()
+        self.covered_tiles_cache = dict()
+
+    def segments_at(self, distance):
+        return np.clip(np.searchsorted(self.arc_length, distance, side="right") - 1, 0, len(self.lengths) - 1)
+
+    def positions_at(self, distance):
+        segment = self.segments_at(distance)
+        along = np.minimum(distance, self.total_length) - self.arc_length[segment]
+        return self.nodes[segment] + self.directions[segment] * along[:, None]
+
+    def coverage(self, centre, radius):
+        key = (centre[0], centre[1], radius)
+        intervals = self.coverage_cache.get(key)
+        if intervals is None:
+            intervals = self.coverage_cache[key] = self.compute_coverage(centre, radius)
+        return intervals
+
+    def compute_coverage(self, centre, radius):
+        to_start = self.nodes[:-1] - centre
+        half_b = self.directions[:, 0] * to_start[:, 0] + self.directions[:, 1] * to_start[:, 1]
+        c = to_start[:, 0] * to_start[:, 0] + to_start[:, 1] * to_start[:, 1] - radius ** 2
+        discriminant = half_b * half_b - c
+        root = np.sqrt(np.maximum(discriminant, 0))
+        enter = np.maximum(-half_b - root, 0)
+        leave = np.minimum(-half_b + root, self.lengths)
+        hit = (discriminant > 0) & (enter < leave)
+
+        starts = self.arc_length[:-1][hit] + enter[hit]
+        ends = self.arc_length[:-1][hit] + leave[hit]
+        if len(starts) == 0:
+            return np.zeros((0, 2))
+        gaps = starts[1:] > ends[:-1]
+        return np.column_stack((starts[np.r_[True, gaps]], ends[np.r_[gaps, True]]))
+
+    def covered_tiles(self, centre, radius):
+        key = (centre[0], centre[1], radius)
+        tiles = self.covered_tiles_cache.get(key)
+        if tiles is None:
+            difference = self.nodes - centre
+            inside = difference[:, 0] * difference[:, 0] + difference[:, 1] * difference[:, 1] < radius ** 2
+            tiles = self.covered_tiles_cache[key] = int((inside & self.on_board).sum())
+        return tiles
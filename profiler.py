@@ -0,0 +1,87 @@
+import csv
+import json
+import time
+
+import numpy as np
+
+GAME_STAGES = ("move_enemies", "tick_projectiles", "tick_towers", "tick_wave")
+DRAW_STAGES = ("draw", "draw_tiles", "draw_cursor", "draw_enemies", "draw_towers", "draw_tower_range",
+               "draw_projectiles", "draw_pause", "draw_menu", "draw_wave_counter")
+COUNT_COLUMNS = ("enemies", "towers", "projectiles")
+PERCENTILES = (50, 95, 99)
+
+
+class Profiler:
+    def __init__(self, capacity=600):
+        self.capacity = capacity
+        self.stages = ["frame"]
+        self.current = [0]
+        self.samples = np.zeros((capacity, 1), dtype=np.int64)
+        self.counts = np.zeros((capacity, len(COUNT_COLUMNS)), dtype=np.int64)
+        self.frames = 0
+        self.frame_start = 0
+
+    def instrument(self, target, names):
+        for name in names:
+            column = len(self.stages)
+            self.stages.append(f"{type(target).__name__}.{name}")
+            self.current.append(0)
+            setattr(target, name, self.timed(column, getattr(target, name)))
+        self.samples = np.zeros((self.capacity, len(self.stages)), dtype=np.int64)
+        self.frames = 0
+
+    def timed(self, column, function):
+        clock = time.perf_counter_ns
+        current = self.current
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            result = function(*args, **kwargs)
+            current[column] += clock() - start
+            return result
+        return wrapper
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter_ns()
+
+    def end_frame(self, frame):
+        self.current[0] = time.perf_counter_ns() - self.frame_start
+        row = self.frames % self.capacity
+        self.samples[row] = self.current
+        self.counts[row] = (frame.enemy_count, len(frame.towers), len(frame.projectiles))
+        self.current[:] = [0] * len(self.current)
+        self.frames += 1
+
+    def recorded(self):
+        if self.frames <= self.capacity:
+            return self.samples[:self.frames], self.counts[:self.frames]
+        row = self.frames % self.capacity
+        order = np.r_[row:self.capacity, 0:row]
+        return self.samples[order], self.counts[order]
+
+    def percentiles(self):
+        samples, _ = self.recorded()
+        if len(samples) == 0:
+            return np.zeros((len(PERCENTILES), len(self.stages)))
+        return np.percentile(samples, PERCENTILES, axis=0)
+
+    def dump(self, path):
+        samples, counts = self.recorded()
+        first_frame = self.frames - len(samples)
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as trace_file:
+                writer = csv.writer(trace_file)
+                writer.writerow(["frame", *(f"{stage}_ns" for stage in self.stages), *COUNT_COLUMNS])
+                for i, (sample, count) in enumerate(zip(samples, counts)):
+                    writer.writerow([first_frame + i, *sample, *count])
+            return
+        percentiles = self.percentiles()
+        trace = {"stages": self.stages,
+                 "counts": list(COUNT_COLUMNS),
+                 "first_frame": first_frame,
+                 "samples_ns": samples.tolist(),
+                 "count_samples": counts.tolist(),
+                 "summary_ns": {stage: {f"p{p}": float(value) for p, value in zip(PERCENTILES, percentiles[:, i])}
+                                for i, stage in enumerate(self.stages)}}
+        with open(path, "w") as trace_file:
+            json.dump(trace, trace_file)
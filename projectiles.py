@@ -0,0 +1,149 @@
+import numpy as np
+
+
+class ProjectilePool:
+    ARRAYS = ("tail", "position", "aim", "target", "speed", "damage", "splash", "tower", "sequence", "flying", "spent")
+
+    def __init__(self, capacity=64):
+        self.launched = 0
+        self.tail = np.zeros((capacity, 2))
+        self.position = np.zeros((capacity, 2))
+        self.aim = np.zeros((capacity, 2))
+        self.target = np.zeros(capacity, dtype=np.int64)
+        self.speed = np.zeros(capacity)
+        self.damage = np.zeros(capacity)
+        self.splash = np.zeros(capacity)
+        self.tower = np.zeros(capacity, dtype=np.int64)
+        self.sequence = np.zeros(capacity, dtype=np.int64)
+        self.flying = np.zeros(capacity, dtype=bool)
+        self.spent = np.zeros(capacity, dtype=bool)
+
+        # Free slots form a stack, popped from the top, so slots are reused before the arrays grow.
+        self.free = np.arange(capacity - 1, -1, -1)
+        self.free_count = capacity
+
+    def __len__(self):
+        return len(self.flying) - self.free_count
+
+    def grow(self, count):
+        capacity = len(self.flying)
+        new_capacity = capacity
+        while new_capacity - capacity + self.free_count < count:
+            new_capacity *= 2
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            grown = np.zeros((new_capacity,) + array.shape[1:], dtype=array.dtype)
+            grown[:capacity] = array
+            setattr(self, name, grown)
+        free = np.empty(new_capacity, dtype=np.int64)
+        added = new_capacity - capacity
+        free[:added] = np.arange(new_capacity - 1, capacity - 1, -1)
+        free[added:added + self.free_count] = self.free[:self.free_count]
+        self.free = free
+        self.free_count += added
+
+    def allocate(self, count):
+        if count > self.free_count:
+            self.grow(count)
+        self.free_count -= count
+        slots = self.free[self.free_count:self.free_count + count][::-1].copy()
+        self.sequence[slots] = np.arange(self.launched, self.launched + count)
+        self.launched += count
+        return slots
+
+    def release(self, slots):
+        self.flying[slots] = False
+        self.spent[slots] = False
+        self.free[self.free_count:self.free_count + len(slots)] = slots
+        self.free_count += len(slots)
+
+    def launch(self, starts, targets, aims, speed, damage, splash, towers):
+        slots = self.allocate(len(targets))
+        self.tail[slots] = starts
+        self.position[slots] = starts
+        self.aim[slots] = aims
+        self.target[slots] = targets
+        self.speed[slots] = speed
+        self.damage[slots] = damage
+        self.splash[slots] = splash
+        self.tower[slots] = towers
+        self.flying[slots] = True
+
+    def trace(self, starts, ends):
+        # Instant shots still leave a tracer, drawn for one tick like a projectile that has just landed.
+        slots = self.allocate(len(starts))
+        self.tail[slots] = starts
+        self.position[slots] = ends
+        self.spent[slots] = True
+
+    def live(self):
+        return np.flatnonzero(self.flying | self.spent)
+
+    def segments(self):
+        live = self.live()
+        return np.concatenate((self.tail[live], self.position[live]), axis=1)
+
+    def load(self, arrays):
+        count = len(arrays["flying"])
+        self.release(self.live())
+        slots = self.allocate(count)
+        for name, values in arrays.items():
+            getattr(self, name)[slots] = values
+        self.launched = int(self.sequence[slots].max()) + 1 if count > 0 else 0
+
+    def tick(self, game_state):
+        if self.free_count == len(self.flying):
+            return
+        self.release(np.flatnonzero(self.spent))
+        active = np.flatnonzero(self.flying)
+        if len(active) == 0:
+            return
+        active = active[np.argsort(self.sequence[active])]
+
+        # Projectiles home in on their target while it lives and fly on to where it was last seen once it is gone.
+        # Enemy serials are in spawn order, which the pool keeps, so they can be looked up with a binary search.
+        enemy_pool = game_state.enemy_pool
+        targets = self.target[active]
+        found = np.searchsorted(enemy_pool.serial[:enemy_pool.size], targets)
+        tracking = found < enemy_pool.size
+        tracking[tracking] &= enemy_pool.serial[found[tracking]] == targets[tracking]
+        tracking[tracking] &= enemy_pool.alive[found[tracking]]
+        self.aim[active[tracking]] = enemy_pool.position[found[tracking]]
+
+        start = self.position[active]
+        self.tail[active] = start
+        difference = self.aim[active] - start
+        distance = np.sqrt(difference[:, 0] * difference[:, 0] + difference[:, 1] * difference[:, 1])
+        speed = self.speed[active]
+        arrived = distance <= speed
+        moving = ~arrived
+        self.position[active[moving]] = start[moving] + difference[moving] * (speed[moving] / distance[moving])[:, None]
+        landed = active[arrived]
+        self.position[landed] = self.aim[landed]
+        self.flying[landed] = False
+        self.spent[landed] = True
+        if len(landed) > 0:
+            self.hit(landed, found[arrived], tracking[arrived], game_state)
+
+    def hit(self, landed, found, tracking, game_state):
+        enemy_pool = game_state.enemy_pool
+        splash = self.splash[landed] > 0
+        direct = ~splash & tracking
+        projectiles = [landed[direct]]
+        enemies = [found[direct]]
+        if splash.any():
+            bursts = landed[splash]
+            difference = enemy_pool.position[None, :enemy_pool.size] - self.position[bursts, None]
+            squared_distance = difference[..., 0] * difference[..., 0] + difference[..., 1] * difference[..., 1]
+            inside = (squared_distance <= self.splash[bursts, None] ** 2) & enemy_pool.alive[:enemy_pool.size]
+            burst, enemy = np.nonzero(inside)
+            projectiles.append(bursts[burst])
+            enemies.append(enemy)
+        projectiles = np.concatenate(projectiles)
+        if len(projectiles) == 0:
+            return
+        enemies = np.concatenate(enemies)
+        order = np.argsort(self.sequence[projectiles], kind="stable")
+        projectiles, enemies = projectiles[order], enemies[order]
+        game_state.damage_enemies(self.tower[projectiles], enemies, self.damage[projectiles],
+                                  self.position[projectiles])
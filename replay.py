@@ -0,0 +1,122 @@
+import argparse
+import time
+from bisect import bisect_right
+
+import numpy as np
+
+from enemy import EnemyType
+from flow_field import FlowMap
+from game_state import GameState
+from simulation import SimulationResult
+from snapshot import take_snapshot, restore_snapshot, pack, unpack
+from wave import Wave
+
+SNAPSHOT_INTERVAL = 300
+
+
+def config_fields(config):
+    width, height, path, waves, batched_towers = config
+    if isinstance(path, FlowMap):
+        path = {"spawns": path.spawns, "exits": path.exits, "paths": path.paths, "mazing": path.mazing}
+    else:
+        path = [[int(value) for value in node] for node in path]
+    waves = [{"spawn_time": wave.spawn_time, "total_amount": wave.total_amount, "spawn_subtime": wave.spawn_subtime,
+              "batch_amount": wave.batch_amount,
+              "enemy_type": {name: getattr(wave.enemy_type, name) for name in EnemyType.__slots__}}
+             for wave in waves]
+    return [width, height, path, waves, batched_towers]
+
+
+def config_from_fields(fields):
+    width, height, path, waves, batched_towers = fields
+    if isinstance(path, dict):
+        path = FlowMap(**path)
+    enemy_types = dict()
+    swept_waves = list()
+    for wave in waves:
+        enemy_type = wave.pop("enemy_type")
+        enemy_type["colour"] = tuple(enemy_type["colour"])
+        # Waves of the same enemy type share one EnemyType, as they do in a live game.
+        key = tuple(enemy_type.values())
+        if key not in enemy_types:
+            enemy_types[key] = EnemyType(**enemy_type)
+        swept_waves.append(Wave(enemy_type=enemy_types[key], **wave))
+    return width, height, path, swept_waves, batched_towers
+
+
+class Recording:
+    def __init__(self, game_state: GameState, snapshot_interval=SNAPSHOT_INTERVAL):
+        self.config = (game_state.width, game_state.height, game_state.path, game_state.waves,
+                       game_state.tower_batch is not None)
+        self.snapshot_interval = snapshot_interval
+        self.actions = list()
+        self.snapshots = {game_state.ticks: take_snapshot(game_state)}
+
+    def record(self, game_state: GameState, action, argument=None):
+        self.actions.append((game_state.ticks, action, argument))
+
+    def on_tick(self, game_state: GameState):
+        if game_state.ticks % self.snapshot_interval == 0:
+            self.snapshots[game_state.ticks] = take_snapshot(game_state)
+
+    def new_game_state(self):
+        width, height, path, waves, batched_towers = self.config
+        return GameState(width, height, path, waves, 0, 0, batched_towers)
+
+    def seek(self, tick, game_state: GameState = None):
+        game_state = game_state or self.new_game_state()
+        snapshot_ticks = sorted(self.snapshots)
+        start = snapshot_ticks[max(bisect_right(snapshot_ticks, tick) - 1, 0)]
+        restore_snapshot(game_state, self.snapshots[start])
+        self.play(game_state, tick)
+        return game_state
+
+    def rewind(self, game_state: GameState, tick):
+        self.seek(tick, game_state)
+        self.actions = [action for action in self.actions if action[0] < game_state.ticks]
+        self.snapshots = {snapshot_tick: snapshot for snapshot_tick, snapshot in self.snapshots.items()
+                          if snapshot_tick <= game_state.ticks}
+
+    def play(self, game_state: GameState, until=None):
+        # Actions logged at tick t happened after t ticks had run, so they are applied before the next tick. Pausing
+        # stops the tick counter as well, so replays tick straight through.
+        next_action = bisect_right([action[0] for action in self.actions], game_state.ticks - 1)
+        while game_state.running and (until is None or game_state.ticks < until):
+            while next_action < len(self.actions) and self.actions[next_action][0] == game_state.ticks:
+                _, action, argument = self.actions[next_action]
+                game_state.apply_action(action, argument)
+                next_action += 1
+            game_state.tick()
+
+    def save(self, path):
+        first_tick = min(self.snapshots)
+        header = {"config": config_fields(self.config), "snapshot_interval": self.snapshot_interval,
+                  "actions": self.actions, "first_tick": first_tick}
+        with open(path, "wb") as recording_file:
+            recording_file.write(pack(header, {"snapshot": np.frombuffer(self.snapshots[first_tick], dtype=np.uint8)}))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as recording_file:
+            header, arrays = unpack(recording_file.read())
+        recording = cls.__new__(cls)
+        recording.config = config_from_fields(header["config"])
+        recording.snapshot_interval = header["snapshot_interval"]
+        recording.actions = [tuple(action) for action in header["actions"]]
+        recording.snapshots = {header["first_tick"]: arrays["snapshot"].tobytes()}
+        return recording
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded game headlessly at full speed.")
+    parser.add_argument("recording", help="file written by main.py --record")
+    parser.add_argument("--until", type=int, default=None, help="stop at this tick instead of the end of the game")
+    arguments = parser.parse_args()
+
+    replay = Recording.load(arguments.recording)
+    replay_state = replay.seek(min(replay.snapshots))
+    start_ticks, start = replay_state.ticks, time.perf_counter()
+    replay.play(replay_state, arguments.until)
+    print(SimulationResult(replay_state.game_won, replay_state.health, replay_state.gold,
+                           replay_state.ticks - start_ticks, [tower.kills for tower in replay_state.towers],
+                           time.perf_counter() - start))
@@ -0,0 +1,60 @@
+import time
+
+from game_state import GameState
+from path import PATH
+from tower import Normal, Heavy
+from wave import DEFAULT_WAVES
+
+
+class SimulationResult:
+    def __init__(self, game_won, health, gold, ticks, tower_kills, elapsed):
+        self.game_won = game_won
+        self.health = health
+        self.gold = gold
+        self.ticks = ticks
+        self.tower_kills = tower_kills
+        self.elapsed = elapsed
+
+    @property
+    def ticks_per_second(self):
+        if self.elapsed == 0:
+            return float("inf")
+        return self.ticks / self.elapsed
+
+    def __repr__(self):
+        outcome = "won" if self.game_won else "lost"
+        return (f"SimulationResult({outcome}, health={self.health}, gold={self.gold}, ticks={self.ticks}, "
+                f"kills={self.tower_kills}, {self.ticks_per_second:.0f} ticks/s)")
+
+
+def new_game_state(tower_layout, waves, width=12, height=12, path=PATH, health=20, gold=150, batched_towers=False,
+                   seed=None):
+    game_state = GameState(width, height, path, waves, health, gold, batched_towers, seed)
+    game_state.paused = False
+    for position, tower_type in tower_layout:
+        if game_state.place_tower(position, tower_type) is None:
+            raise ValueError(f"Cannot place {tower_type.name} at {tuple(position)}")
+    return game_state
+
+
+def run_game_state(game_state: GameState, max_ticks=None):
+    ticks = 0
+    start = time.perf_counter()
+    while game_state.running and (max_ticks is None or ticks < max_ticks):
+        game_state.tick()
+        ticks += 1
+    elapsed = time.perf_counter() - start
+    return SimulationResult(game_state.game_won, game_state.health, game_state.gold, ticks,
+                            [tower.kills for tower in game_state.towers], elapsed)
+
+
+def run_simulation(tower_layout, waves, width=12, height=12, path=PATH, health=20, gold=150, max_ticks=None,
+                   batched_towers=False, seed=None):
+    game_state = new_game_state(tower_layout, waves, width, height, path, health, gold, batched_towers, seed)
+    return run_game_state(game_state, max_ticks)
+
+
+if __name__ == "__main__":
+    sample_game = new_game_state([((4, 2), Normal), ((7, 4), Heavy)], DEFAULT_WAVES, gold=150, seed=0)
+    print(run_game_state(sample_game))
+    print(sample_game.stats)
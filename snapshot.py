@@ -0,0 +1,155 @@
+import io
+import json
+
+import numpy as np
+
+from enemy import Enemy
+from enemy_pool import EnemyPool
+from tower import TowerType, Tower, TargetingPriority, TOWER_TYPES
+from projectiles import ProjectilePool
+from tower_batch import TowerBatch
+
+SNAPSHOT_VERSION = 3
+
+
+def pack(header, arrays) -> bytes:
+    # Snapshots and recordings come back in bug reports, so they hold only plain data: an npz archive of arrays plus
+    # a JSON header, which is read back without unpickling anything.
+    buffer = io.BytesIO()
+    np.savez(buffer, header=np.array(json.dumps(header)), **arrays)
+    return buffer.getvalue()
+
+
+def unpack(data: bytes):
+    with np.load(io.BytesIO(data), allow_pickle=False) as archive:
+        arrays = {name: archive[name] for name in archive.files}
+    return json.loads(str(arrays.pop("header"))), arrays
+
+
+def tower_type_fields(tower_type: TowerType):
+    # A list, as it comes back from the JSON header, so fields from a snapshot compare equal to a live type's.
+    return [tower_type.price, tower_type.max_range, tower_type.firing_time, tower_type.damage, list(tower_type.colour),
+            tower_type.base_colour_id, tower_type.name, tower_type.targeting_priority.value,
+            tower_type.projectile_speed, tower_type.splash_radius]
+
+
+def take_snapshot(game_state) -> bytes:
+    enemy_pool = game_state.enemy_pool
+    alive = np.flatnonzero(enemy_pool.alive[:enemy_pool.size])
+    enemies = [enemy_pool.enemies[i] for i in alive]
+    enemy_type_names = sorted({enemy.enemy_type.name for enemy in enemies})
+
+    tower_types = list()
+    for tower in game_state.towers:
+        if tower_type_fields(tower.tower_type) not in tower_types:
+            tower_types.append(tower_type_fields(tower.tower_type))
+    projectile_pool = game_state.projectiles
+    live_projectiles = projectile_pool.live()
+    if game_state.selected_tower_type is not None:
+        if tower_type_fields(game_state.selected_tower_type) not in tower_types:
+            tower_types.append(tower_type_fields(game_state.selected_tower_type))
+    if game_state.tower_batch is not None:
+        tower_batch = game_state.tower_batch
+        phase, ready, kills = tower_batch.phase.copy(), tower_batch.ready.copy(), tower_batch.kills.copy()
+    else:
+        phase = np.array([tower.phase for tower in game_state.towers], dtype=np.int64)
+        ready = np.array([tower.ready_to_shoot for tower in game_state.towers], dtype=bool)
+        kills = np.array([tower.kills for tower in game_state.towers], dtype=np.int64)
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "ticks": int(game_state.ticks),
+        "flags": [bool(game_state.game_won), bool(game_state.running), bool(game_state.paused)],
+        "wave": [int(game_state.current_wave_id), int(game_state.wave_tick), int(game_state.spawned)],
+        "rng": game_state.rng.bit_generator.state,
+        "health": int(game_state.health),
+        "gold": int(game_state.gold),
+        "cursor": [int(value) for value in game_state.cursor],
+        "selected": None if game_state.selected_tower_type is None
+        else tower_types.index(tower_type_fields(game_state.selected_tower_type)),
+        "enemy_types": enemy_type_names,
+        "enemies_spawned": int(enemy_pool.spawned),
+        "tower_types": tower_types,
+    }
+    arrays = {
+        "map": game_state.map.tiles,
+        "offsets": game_state.enemy_offsets.block[game_state.enemy_offsets.next_offset:],
+        "enemy_type_ids": np.array([enemy_type_names.index(enemy.enemy_type.name) for enemy in enemies], dtype=np.int8),
+        "tower_positions": np.array([tower.position for tower in game_state.towers], dtype=np.int64).reshape(-1, 2),
+        "tower_type_ids": np.array([tower_types.index(tower_type_fields(tower.tower_type))
+                                    for tower in game_state.towers], dtype=np.int8),
+        "tower_phase": phase,
+        "tower_ready": ready,
+        "tower_kills": kills,
+    }
+    arrays.update({f"enemies.{name}": getattr(enemy_pool, name)[alive] for name in EnemyPool.ARRAYS if name != "alive"})
+    arrays.update({f"projectiles.{name}": getattr(projectile_pool, name)[live_projectiles]
+                   for name in ProjectilePool.ARRAYS})
+    return pack(header, arrays)
+
+
+def resolve_tower_type(fields, known_types):
+    for tower_type in known_types:
+        if tower_type_fields(tower_type) == fields:
+            return tower_type
+    price, max_range, firing_time, damage, colour, base_colour_id, name, targeting_priority, projectile_speed, \
+        splash_radius = fields
+    return TowerType(price, max_range, firing_time, damage, tuple(colour), base_colour_id, name,
+                     TargetingPriority(targeting_priority), projectile_speed, splash_radius)
+
+
+def restore_snapshot(game_state, data: bytes):
+    state, arrays = unpack(data)
+    if state["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {state['version']}")
+    state.update(arrays)
+    for group in ("enemies", "projectiles"):
+        state[group] = {name.partition(".")[2]: values for name, values in arrays.items()
+                        if name.startswith(f"{group}.")}
+
+    game_state.ticks = state["ticks"]
+    game_state.game_won, game_state.running, game_state.paused = state["flags"]
+    game_state.map.load(state["map"])
+    game_state.current_wave_id, game_state.wave_tick, game_state.spawned = state["wave"]
+    game_state.current_wave = game_state.waves[game_state.current_wave_id]
+    game_state.rng.bit_generator.state = state["rng"]
+    game_state.enemy_offsets.block = state["offsets"].copy()
+    game_state.enemy_offsets.next_offset = 0
+    game_state.health = state["health"]
+    game_state.gold = state["gold"]
+    game_state.cursor = list(state["cursor"])
+
+    wave_enemy_types = {wave.enemy_type.name: wave.enemy_type for wave in game_state.waves}
+    enemy_types = [wave_enemy_types[name] for name in state["enemy_types"]]
+    size = len(state["enemy_type_ids"])
+    enemy_pool = game_state.enemy_pool = EnemyPool(max(64, size))
+    for name, values in state["enemies"].items():
+        getattr(enemy_pool, name)[:size] = values
+    enemy_pool.alive[:size] = True
+    enemy_pool.size = size
+    enemy_pool.spawned = state["enemies_spawned"]
+    for index, (serial, type_id) in enumerate(zip(state["enemies"]["serial"], state["enemy_type_ids"])):
+        enemy = Enemy(enemy_pool, index, int(serial), enemy_types[type_id])
+        enemy_pool.enemies.append(enemy)
+
+    known_types = list(TOWER_TYPES.values()) + [tower.tower_type for tower in game_state.towers]
+    tower_types = [resolve_tower_type(fields, known_types) for fields in state["tower_types"]]
+    game_state.selected_tower_type = None if state["selected"] is None else tower_types[state["selected"]]
+    game_state.towers = list()
+    if game_state.tower_batch is not None:
+        game_state.tower_batch = TowerBatch()
+    for index, (position, type_id, phase, ready, kills) in enumerate(zip(
+            state["tower_positions"], state["tower_type_ids"], state["tower_phase"], state["tower_ready"],
+            state["tower_kills"])):
+        tower = Tower((int(position[0]), int(position[1])), tower_types[type_id], index)
+        tower.phase, tower.ready_to_shoot, tower.kills = int(phase), bool(ready), int(kills)
+        game_state.towers.append(tower)
+        if game_state.tower_batch is not None:
+            game_state.tower_batch.add(tower)
+    if game_state.tower_batch is not None:
+        game_state.tower_batch.phase[:] = state["tower_phase"]
+        game_state.tower_batch.ready[:] = state["tower_ready"]
+        game_state.tower_batch.kills[:] = state["tower_kills"]
+    game_state.projectiles = ProjectilePool(max(64, len(state["projectiles"]["flying"])))
+    game_state.projectiles.load(state["projectiles"])
+    game_state.events.clear()
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+class SpatialGrid:
+    def __init__(self):
+        self.positions = np.zeros((0, 2))
+        self.order = np.zeros(0, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.origin = np.zeros(2, dtype=np.int64)
+        self.span = np.zeros(2, dtype=np.int64)
+
+    def rebuild(self, enemy_pool):
+        positions = self.positions = enemy_pool.position[:enemy_pool.size]
+        if len(positions) == 0:
+            self.order = self.keys = np.zeros(0, dtype=np.int64)
+            return
+        cells = np.floor(positions).astype(np.int64)
+        self.origin = cells.min(axis=0)
+        self.span = cells.max(axis=0) - self.origin + 1
+        cells -= self.origin
+        keys = cells[:, 0] * self.span[1] + cells[:, 1]
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def query(self, tower):
+        centre, radius = tower.position, tower.max_range
+        if len(self.keys) == 0:
+            return self.order
+        low = np.floor(np.subtract(centre, radius)).astype(np.int64) - self.origin
+        high = np.floor(np.add(centre, radius)).astype(np.int64) - self.origin
+        low = np.maximum(low, 0)
+        high = np.minimum(high, self.span - 1)
+        if low[0] > high[0] or low[1] > high[1]:
+            return self.order[:0]
+
+        columns = np.arange(low[0], high[0] + 1) * self.span[1]
+        starts = np.searchsorted(self.keys, columns + low[1], side="left")
+        ends = np.searchsorted(self.keys, columns + high[1], side="right")
+        candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends)])
+
+        difference = self.positions[candidates] - centre
+        squared_distance = difference[:, 0] * difference[:, 0] + difference[:, 1] * difference[:, 1]
+        return np.sort(candidates[squared_distance < radius ** 2])
+
+
+class PathCoverageIndex:
+    def __init__(self, path_model, margin):
+        self.path_model = path_model
+        self.margin = margin
+        self.positions = np.zeros((0, 2))
+        self.order = np.zeros(0, dtype=np.int64)
+        self.distances = np.zeros(0)
+
+    def rebuild(self, enemy_pool):
+        self.positions = enemy_pool.position[:enemy_pool.size]
+        distance = enemy_pool.distance[:enemy_pool.size]
+        self.order = np.argsort(distance, kind="stable")
+        self.distances = distance[self.order]
+
+    def query(self, tower):
+        intervals = self.path_model.coverage(tower.position, tower.max_range + self.margin)
+        starts = np.searchsorted(self.distances, intervals[:, 0], side="left")
+        ends = np.searchsorted(self.distances, intervals[:, 1], side="right")
+        candidates = np.concatenate([self.order[start:end] for start, end in zip(starts, ends)] or [self.order[:0]])
+
+        difference = self.positions[candidates] - tower.position
+        squared_distance = difference[:, 0] * difference[:, 0] + difference[:, 1] * difference[:, 1]
+        return np.sort(candidates[squared_distance < tower.max_range ** 2])
@@ -0,0 +1,127 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation import run_simulation
+from tower import TowerType, TOWER_TYPES
+from wave import Wave, DEFAULT_WAVES
+
+TOWER_FIELDS = ("price", "max_range", "firing_time", "damage", "projectile_speed", "splash_radius")
+WAVE_FIELDS = ("spawn_time", "total_amount", "spawn_subtime", "batch_amount")
+GAME_FIELDS = ("health", "gold", "seed")
+RESULT_COLUMNS = ("valid", "game_won", "health_left", "gold_left", "ticks")
+
+
+def expand_grid(grid):
+    keys = sorted(grid)
+    for key in keys:
+        check_key(key)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def check_key(key):
+    if key in GAME_FIELDS:
+        return
+    target, _, field = key.partition(".")
+    if target in TOWER_TYPES and field in TOWER_FIELDS:
+        return
+    if target.startswith("wave") and target[4:].isdigit() and field in WAVE_FIELDS:
+        return
+    raise ValueError(f"Unknown sweep parameter {key}")
+
+
+def with_changes(tower_type: TowerType, changes):
+    fields = {field: getattr(tower_type, field) for field in TOWER_FIELDS}
+    fields.update(changes)
+    return TowerType(fields["price"], fields["max_range"], fields["firing_time"], fields["damage"], tower_type.colour,
+                     tower_type.base_colour_id, tower_type.name, tower_type.targeting_priority,
+                     fields["projectile_speed"], fields["splash_radius"])
+
+
+def build_scenario(params, layout, waves):
+    tower_changes = {name: dict() for name in TOWER_TYPES}
+    wave_changes = [dict() for _ in waves]
+    for key, value in params.items():
+        target, _, field = key.partition(".")
+        if target in TOWER_TYPES:
+            tower_changes[target][field] = value
+        elif target.startswith("wave"):
+            wave_changes[int(target[4:])][field] = value
+
+    tower_types = {name: with_changes(tower_type, tower_changes[name]) for name, tower_type in TOWER_TYPES.items()}
+    tower_layout = [(tuple(position), tower_types[name]) for position, name in layout]
+    swept_waves = list()
+    for wave, changes in zip(waves, wave_changes):
+        fields = {field: getattr(wave, field) for field in WAVE_FIELDS}
+        fields.update(changes)
+        swept_waves.append(Wave(fields["spawn_time"], wave.enemy_type, fields["total_amount"],
+                                fields["spawn_subtime"], fields["batch_amount"]))
+    return tower_layout, swept_waves
+
+
+def run_job(job):
+    job_id, params, layout, waves = job
+    row = {"job_id": job_id, **params}
+    try:
+        tower_layout, swept_waves = build_scenario(params, layout, waves)
+        result = run_simulation(tower_layout, swept_waves, health=params.get("health", 20),
+                                gold=params.get("gold", 150), batched_towers=True, seed=params.get("seed"))
+    except ValueError:
+        row.update(valid=0, game_won=0, health_left=0, gold_left=0, ticks=0)
+        row.update({f"kills_{i}": 0 for i in range(len(layout))})
+        return row
+    row.update(valid=1, game_won=int(result.game_won), health_left=result.health, gold_left=result.gold,
+               ticks=result.ticks)
+    row.update({f"kills_{i}": kills for i, kills in enumerate(result.tower_kills)})
+    return row
+
+
+def finished_jobs(output_path):
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, "rb+") as output_file:
+        content = output_file.read()
+        if content and not content.endswith(b"\n"):
+            output_file.truncate(content.rfind(b"\n") + 1)
+    with open(output_path, newline="") as output_file:
+        return {int(row["job_id"]) for row in csv.DictReader(output_file)}
+
+
+def run_sweep(grid, layout, output_path, waves=DEFAULT_WAVES, workers=None, progress_every=100):
+    combinations = expand_grid(grid)
+    done = finished_jobs(output_path)
+    jobs = [(job_id, params, layout, waves) for job_id, params in enumerate(combinations) if job_id not in done]
+    columns = ["job_id", *sorted(grid), *RESULT_COLUMNS, *(f"kills_{i}" for i in range(len(layout)))]
+    print(f"{len(combinations)} games, {len(done)} already done, {len(jobs)} to run")
+
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    with open(output_path, "a", newline="") as output_file, ProcessPoolExecutor(workers) as executor:
+        writer = csv.DictWriter(output_file, columns)
+        if output_file.tell() == 0:
+            writer.writeheader()
+        chunksize = max(1, len(jobs) // (workers * 16))
+        for count, row in enumerate(executor.map(run_job, jobs, chunksize=chunksize), 1):
+            writer.writerow(row)
+            if count % progress_every == 0 or count == len(jobs):
+                output_file.flush()
+                elapsed = time.perf_counter() - start
+                remaining = elapsed / count * (len(jobs) - count)
+                print(f"{count}/{len(jobs)} games, {count / elapsed:.1f} games/s, {remaining:.0f}s left")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep tower and wave parameters over headless games.")
+    parser.add_argument("config", help='JSON file with a "layout" of [x, y, tower name] and a parameter "grid"')
+    parser.add_argument("output", help="CSV file to write, resumed if it already exists")
+    parser.add_argument("--workers", type=int, default=None)
+    arguments = parser.parse_args()
+
+    with open(arguments.config) as config_file:
+        config = json.load(config_file)
+    run_sweep(config["grid"], [((x, y), name) for x, y, name in config["layout"]], arguments.output,
+              workers=arguments.workers)
@@ -0,0 +1,44 @@
+import numpy as np
+
+EMPTY_TILE = 0
+PATH_TILE = -1
+
+
+class TileGrid:
+    def __init__(self, width, height, path):
+        self.width = width
+        self.height = height
+        self.tiles = np.full((width, height), EMPTY_TILE, dtype=np.int8)
+        path = np.array(path, dtype=np.int64).reshape(-1, 2)
+        on_board = (path[:, 0] >= 0) & (path[:, 0] < width) & (path[:, 1] >= 0) & (path[:, 1] < height)
+        self.tiles[path[on_board, 0], path[on_board, 1]] = PATH_TILE
+
+        # One entry per version: the (x, y) tile that changed, or None when the whole grid was replaced.
+        self.changes = list()
+
+    @property
+    def version(self):
+        return len(self.changes)
+
+    def __getitem__(self, position):
+        return self.tiles[position]
+
+    def set(self, position, value):
+        self.tiles[position[0], position[1]] = value
+        self.changes.append((position[0], position[1]))
+
+    def load(self, tiles):
+        self.tiles[:] = tiles
+        self.changes.append(None)
+
+    def copy(self):
+        tile_grid = TileGrid(self.width, self.height, ())
+        tile_grid.tiles[:] = self.tiles
+        tile_grid.changes = list(self.changes)
+        return tile_grid
+
+    def changes_since(self, version):
+        return self.changes[version:]
+
+    def free_tiles(self):
+        return np.argwhere(self.tiles == EMPTY_TILE)
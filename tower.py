@@ -1,15 +1,24 @@
 from enum import Enum
 
-from timer import new_timer
+import numpy as np
+
+from events import EventType
 
 
 class TargetingPriority(Enum):
     First = 1
     Strongest = 2
+    Last = 3
+    Weakest = 4
+    Closest = 5
 
 
 class TowerType:
-    def __init__(self, price, max_range, firing_time, damage, color, base_colour_id, name, targeting_priority):
+    __slots__ = ("price", "_max_range", "range_squared", "firing_time", "damage", "colour", "base_colour_id", "name",
+                 "targeting_priority", "projectile_speed", "splash_radius")
+
+    def __init__(self, price, max_range, firing_time, damage, color, base_colour_id, name, targeting_priority,
+                 projectile_speed=None, splash_radius=0.0):
         self.price = price
         self.max_range = max_range
         self.firing_time = firing_time
@@ -20,55 +29,109 @@ class TowerType:
         self.name = name
         self.targeting_priority = targeting_priority
 
+        # Tiles per tick, or None for a hitscan tower whose shots land the tick they are fired.
+        self.projectile_speed = projectile_speed
+        self.splash_radius = splash_radius
+
+    @property
+    def max_range(self):
+        return self._max_range
+
+    @max_range.setter
+    def max_range(self, max_range):
+        # The squared range is kept precomputed for the range checks and follows any change to the range.
+        self._max_range = max_range
+        self.range_squared = max_range ** 2
+
 
 TOWER_GRAY = (100, 100, 100)
 TOWER_GREEN = (50, 200, 50)
 TOWER_BLUE = (50, 50, 200)
 TOWER_RED = (200, 50, 50)
 
-Normal = TowerType(50, 2.5, 60, 25, TOWER_GRAY, 1, "Normal Tower", TargetingPriority.First)
-Heavy = TowerType(100, 3, 60, 50, TOWER_RED, 2, "Heavy Tower", TargetingPriority.First)
-MachineGun = TowerType(125, 1.5, 5, 5, TOWER_GREEN, 3, "Machine Gun Tower", TargetingPriority.First)
+Normal = TowerType(50, 2.5, 60, 25, TOWER_GRAY, 1, "Normal Tower", TargetingPriority.First, 0.5)
+Heavy = TowerType(100, 3, 60, 50, TOWER_RED, 2, "Heavy Tower", TargetingPriority.First, 0.35, 1.0)
+MachineGun = TowerType(125, 1.5, 5, 5, TOWER_GREEN, 3, "Machine Gun Tower", TargetingPriority.First, 0.8)
 Sniper = TowerType(175, 4.5, 125, 200, TOWER_BLUE, 4, "Sniper Tower", TargetingPriority.Strongest)
 
+TOWER_TYPES = {"Normal": Normal, "Heavy": Heavy, "MachineGun": MachineGun, "Sniper": Sniper}
+
 
 class Tower:
-    def __init__(self, position, tower_type: TowerType):
-        self.max_range = tower_type.max_range
-        self.firing_time = tower_type.firing_time
-        self.damage = tower_type.damage
-        self.targeting_priority = tower_type.targeting_priority
+    __slots__ = ("tower_type", "index", "position", "target", "phase", "ready_to_shoot", "kills")
 
-        self.position = list(position)
+    def __init__(self, position, tower_type: TowerType, index=0):
+        self.tower_type = tower_type
+        self.index = index
+        self.position = (position[0], position[1])
         self.target = None
-        self.firing_timer = new_timer(self.firing_time)
+        self.phase = 0
         self.ready_to_shoot = True
+        self.kills = 0
+
+    @property
+    def max_range(self):
+        return self.tower_type.max_range
 
-        self.colour = tower_type.colour
+    @property
+    def firing_time(self):
+        return self.tower_type.firing_time
+
+    @property
+    def damage(self):
+        return self.tower_type.damage
+
+    @property
+    def targeting_priority(self):
+        return self.tower_type.targeting_priority
+
+    @property
+    def colour(self):
+        return self.tower_type.colour
 
     def get_target(self, game_state):
-        if self.targeting_priority == TargetingPriority.Strongest:
-            enemies = sorted(game_state.enemies, key=lambda x: x.health, reverse=True)
-        else:
-            enemies = game_state.enemies
-        for enemy in enemies:
-            squared_distance = sum([(enemy.position[i] - self.position[i])**2 for i in range(2)])
-            if squared_distance < self.max_range**2:
-                self.target = enemy
-                return
-        else:
+        enemy_pool = game_state.enemy_pool
+        targeting_priority = self.tower_type.targeting_priority
+        in_range = game_state.enemy_index.query(self)
+        in_range = in_range[enemy_pool.alive[in_range]]
+        # Candidates are in pool order, which is spawn order, so ties go to the enemy spawned first, as in TowerBatch.
+        if len(in_range) == 0:
             self.target = None
+        elif targeting_priority == TargetingPriority.Strongest:
+            self.target = enemy_pool.enemies[in_range[np.argmax(enemy_pool.health[in_range])]]
+        elif targeting_priority == TargetingPriority.Weakest:
+            self.target = enemy_pool.enemies[in_range[np.argmin(enemy_pool.health[in_range])]]
+        elif targeting_priority == TargetingPriority.Last:
+            self.target = enemy_pool.enemies[in_range[np.argmin(enemy_pool.distance[in_range])]]
+        elif targeting_priority == TargetingPriority.Closest:
+            difference = enemy_pool.position[in_range] - self.position
+            squared_distance = difference[:, 0] * difference[:, 0] + difference[:, 1] * difference[:, 1]
+            self.target = enemy_pool.enemies[in_range[np.argmin(squared_distance)]]
+        else:
+            self.target = enemy_pool.enemies[in_range[np.argmax(enemy_pool.distance[in_range])]]
 
     def shoot(self, game_state):
-        game_state.projectiles.append((self.position, self.target.position))
+        tower_type = self.tower_type
+        target_position = self.target.position
+        if tower_type.projectile_speed is not None:
+            self.ready_to_shoot = False
+            game_state.projectiles.launch([self.position], [self.target.serial], [target_position],
+                                          tower_type.projectile_speed, tower_type.damage, tower_type.splash_radius,
+                                          self.index)
+            return
+        game_state.projectiles.trace([self.position], [target_position])
+        game_state.events.emit(EventType.Hit, self.target.serial, self.tower_type.damage,
+                               (self.position[0], self.position[1], target_position[0], target_position[1]))
         self.ready_to_shoot = False
-        if self.target.damage_check(self.damage):
+        if self.target.damage_check(self.tower_type.damage):
             self.target.on_death(game_state)
             self.target = None
+            self.kills += 1
 
     def tick(self, game_state):
         self.get_target(game_state)
         if self.ready_to_shoot and self.target is not None and not self.target.is_gone:
             self.shoot(game_state)
-        if not self.ready_to_shoot and next(self.firing_timer):
-            self.ready_to_shoot = True
+        if not self.ready_to_shoot:
+            self.ready_to_shoot = self.phase == 0
+            self.phase = (self.phase + 1) % self.tower_type.firing_time
@@ -0,0 +1,118 @@
+import numpy as np
+
+from tower import Tower, TargetingPriority
+
+
+class TowerBatch:
+    def __init__(self):
+        self.towers = list()
+        self.position = np.zeros((0, 2))
+        self.range_squared = np.zeros(0)
+        self.damage = np.zeros(0)
+        self.firing_time = np.zeros(0, dtype=np.int64)
+        self.projectile_speed = np.zeros(0)
+        self.splash_radius = np.zeros(0)
+        self.phase = np.zeros(0, dtype=np.int64)
+        self.ready = np.zeros(0, dtype=bool)
+        self.priority = np.zeros(0, dtype=np.int64)
+        self.kills = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.towers)
+
+    def add(self, tower: Tower):
+        self.towers.append(tower)
+        self.position = np.append(self.position, [tower.position], axis=0)
+        self.range_squared = np.append(self.range_squared, tower.tower_type.range_squared)
+        self.damage = np.append(self.damage, tower.damage)
+        self.firing_time = np.append(self.firing_time, tower.firing_time)
+        self.projectile_speed = np.append(self.projectile_speed, tower.tower_type.projectile_speed or 0.0)
+        self.splash_radius = np.append(self.splash_radius, tower.tower_type.splash_radius)
+        self.phase = np.append(self.phase, 0)
+        self.ready = np.append(self.ready, True)
+        self.priority = np.append(self.priority, tower.targeting_priority.value)
+        self.kills = np.append(self.kills, 0)
+
+    def pick_targets(self, shooters, squared_distance, in_range, enemy_pool):
+        candidates = in_range[shooters] & enemy_pool.alive[:enemy_pool.size]
+        has_target = candidates.any(axis=1)
+        distance = enemy_pool.distance[:enemy_pool.size]
+        targets = np.argmax(np.where(candidates, distance, -np.inf), axis=1)
+        priority = self.priority[shooters]
+        health = enemy_pool.health[:enemy_pool.size]
+
+        last = priority == TargetingPriority.Last.value
+        if last.any():
+            targets[last] = np.argmin(np.where(candidates[last], distance, np.inf), axis=1)
+        strongest = priority == TargetingPriority.Strongest.value
+        if strongest.any():
+            targets[strongest] = np.argmax(np.where(candidates[strongest], health, -np.inf), axis=1)
+        weakest = priority == TargetingPriority.Weakest.value
+        if weakest.any():
+            targets[weakest] = np.argmin(np.where(candidates[weakest], health, np.inf), axis=1)
+        closest = priority == TargetingPriority.Closest.value
+        if closest.any():
+            distances = squared_distance[shooters[closest]]
+            targets[closest] = np.argmin(np.where(candidates[closest], distances, np.inf), axis=1)
+        return shooters[has_target], targets[has_target]
+
+    def accepted_shots(self, shooters, targets, in_range, enemy_pool):
+        # Projectiles only land on a later tick, so only hitscan damage can change the targets of later towers.
+        damage = np.where(self.projectile_speed[shooters] > 0, 0.0, self.damage[shooters])
+        order = np.argsort(targets, kind="stable")
+        sorted_targets = targets[order]
+        damage_before = np.cumsum(damage[order]) - damage[order]
+        group_start = np.flatnonzero(np.r_[True, sorted_targets[1:] != sorted_targets[:-1]])
+        group_sizes = np.diff(np.r_[group_start, len(order)])
+        damage_before -= np.repeat(damage_before[group_start], group_sizes)
+
+        prior_damage = np.empty_like(damage_before)
+        prior_damage[order] = damage_before
+        priority = self.priority[shooters]
+        blocked = prior_damage >= enemy_pool.health[targets]
+        strongest = priority == TargetingPriority.Strongest.value
+        blocked[strongest] = prior_damage[strongest] > 0
+        weakest = np.flatnonzero(priority == TargetingPriority.Weakest.value)
+        if len(weakest) > 0:
+            earlier_hits = in_range[np.ix_(shooters[weakest], targets)] & (np.arange(len(shooters)) < weakest[:, None])
+            blocked[weakest] = earlier_hits.any(axis=1)
+        return int(np.argmax(blocked)) if blocked.any() else len(shooters)
+
+    def shoot(self, shooters, targets, game_state):
+        enemy_pool = game_state.enemy_pool
+        self.ready[shooters] = False
+        launched = self.projectile_speed[shooters] > 0
+        if launched.any():
+            launchers, launched_targets = shooters[launched], targets[launched]
+            game_state.projectiles.launch(self.position[launchers], enemy_pool.serial[launched_targets],
+                                          enemy_pool.position[launched_targets], self.projectile_speed[launchers],
+                                          self.damage[launchers], self.splash_radius[launchers], launchers)
+            shooters, targets = shooters[~launched], targets[~launched]
+        if len(shooters) > 0:
+            game_state.projectiles.trace(self.position[shooters], enemy_pool.position[targets])
+            game_state.damage_enemies(shooters, targets, self.damage[shooters], self.position[shooters])
+
+    def tick_timers(self):
+        waiting = np.flatnonzero(~self.ready)
+        phase = self.phase[waiting]
+        self.ready[waiting[phase == 0]] = True
+        self.phase[waiting] = (phase + 1) % self.firing_time[waiting]
+
+    def tick(self, game_state):
+        enemy_pool = game_state.enemy_pool
+        shooters = np.flatnonzero(self.ready)
+        if len(shooters) > 0 and len(enemy_pool) > 0:
+            difference = enemy_pool.position[None, :enemy_pool.size] - self.position[:, None]
+            squared_distance = difference[..., 0] * difference[..., 0] + difference[..., 1] * difference[..., 1]
+            in_range = squared_distance < self.range_squared[:, None]
+
+            # Later towers see the damage dealt by earlier ones, so every round accepts the shots up to the first
+            # tower whose target could have changed and re-targets the rest against the updated health.
+            while len(shooters) > 0:
+                shooters, targets = self.pick_targets(shooters, squared_distance, in_range, enemy_pool)
+                if len(shooters) == 0:
+                    break
+                accepted = self.accepted_shots(shooters, targets, in_range, enemy_pool)
+                self.shoot(shooters[:accepted], targets[:accepted], game_state)
+                shooters = shooters[accepted:]
+        self.tick_timers()
@@ -1,41 +1,38 @@
 from enemy import EnemyType
-from timer import new_timer
 
 
 class Wave:
+    __slots__ = ("spawn_time", "enemy_type", "total_amount", "spawn_subtime", "batch_amount", "spawn_ticks")
+
     def __init__(self, spawn_time, enemy_type: EnemyType, total_amount, spawn_subtime, batch_amount):
         self.spawn_time = spawn_time
         self.enemy_type = enemy_type
-        self.current_amount = 0
         self.total_amount = total_amount
 
         self.spawn_subtime = spawn_subtime
         self.batch_amount = batch_amount
-        self.current_batch_amount = 0
-        self.inside_batch = False
 
-        self.spawn_timer = new_timer(self.spawn_time)
-        if spawn_subtime != 0:
-            self.spawn_subtimer = new_timer(self.spawn_subtime)
+        self.spawn_ticks = self.compile_schedule()
+
+    def compile_schedule(self):
+        if self.spawn_subtime == 0:
+            return [i * self.spawn_time for i in range(self.total_amount)]
+        if self.batch_amount <= 0:
+            raise ValueError("Batched waves need a batch_amount of at least 1")
+
+        # A batch starts the tick after the spawn timer fires, spawns one enemy every spawn_subtime ticks,
+        # then takes one more tick to close before the spawn timer starts counting again.
+        batch_period = (self.batch_amount - 1) * self.spawn_subtime + 2 + self.spawn_time
+        return [i // self.batch_amount * batch_period + 1 + i % self.batch_amount * self.spawn_subtime
+                for i in range(self.total_amount)]
+
+    def spawn_tick(self, number):
+        return self.spawn_ticks[number]
 
-    def enemy_to_spawn(self):
-        while self.current_amount < self.total_amount:
-            if self.inside_batch:
-                while self.current_batch_amount < self.batch_amount:
-                    if next(self.spawn_subtimer):
-                        self.current_batch_amount += 1
-                        self.current_amount += 1
-                        yield self.enemy_type
-                self.current_batch_amount = 0
-                self.inside_batch = False
-            elif next(self.spawn_timer):
-                if self.spawn_subtime == 0:
-                    self.current_amount += 1
-                    yield self.enemy_type
-                else:
-                    self.inside_batch = True
-            yield None
-        yield None
+    def ticks_until_spawn(self, spawned, wave_tick):
+        if spawned >= self.total_amount:
+            return None
+        return self.spawn_ticks[spawned] - wave_tick
 
 
 PURPLE = (220, 0, 220)